@@ -2,7 +2,7 @@
 import os.path
 from datetime import datetime
 from enum import Enum
-from typing import Iterable, List, Optional, Sequence, Tuple
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
 
 import aqt
 from anki.errors import InvalidInput
@@ -32,8 +32,10 @@ def units_to_plain(lines: Iterable[Iterable[Unit]]) -> Iterable[str]:
 
 
 def convert_lines(lines: Iterable[str]) -> Optional[List[List[Unit]]]:
+    if not gv.convert_check():
+        return None
     try:
-        return [convert(gv.mecab_handle.analyze(line), gv.prefs.convert, gv.dictionary) for line in lines]
+        return [convert(punits, gv.prefs.convert, gv.dictionary) for punits in gv.mecab_handle.analyze_many(lines)]
     except MecabError as e:
         aqt.utils.showWarning(f"Mecab error, stopping conversion: {e}")
         return None
@@ -56,17 +58,27 @@ def convert_notes(brws: Browser, note_ids: Sequence[NoteId], field_idx: int,
     updated_notes: List[Note] = []
     backup_data: List[Tuple[NoteId, str, str]] = []
 
+    def update_note(note_id: NoteId, note: Note, field: str, new_val: str):
+        if not dry_run:
+            if backup:
+                backup_data.append((note_id, field, new_val))
+            note.fields[field_idx] = new_val
+            updated_notes.append(note)
+
+    # lines of all notes are converted in one batch so that MeCab can be kept busy, each note either
+    # has its finished units or the range of its lines in that batch
+    pending: List[Tuple[NoteId, Note, str, Union[List[List[Unit]], Tuple[int, int]]]] = []
+    conv_lines: List[str] = []
+
+    def queue_lines(note_id: NoteId, note: Note, field: str, lines: Iterable[str]):
+        start = len(conv_lines)
+        conv_lines.extend(lines)
+        pending.append((note_id, note, field, (start, len(conv_lines))))
+
     for note_id in note_ids:
         note = brws.col.get_note(note_id)
         field = note.fields[field_idx]
 
-        def update_note(new_val: str):
-            if not dry_run:
-                if backup:
-                    backup_data.append((note_id, field, new_val))
-                note.fields[field_idx] = new_val
-                updated_notes.append(note)
-
         lines = strip_html(squash_newlines(field))
         existing_type = detect_syntax(field)
         if existing_type:
@@ -82,21 +94,32 @@ def convert_notes(brws: Browser, note_ids: Sequence[NoteId], field_idx: int,
                 continue
 
             if conv_type == ConvType.REMOVE:
-                update_note(insert_nbsp("<br>".join(units_to_plain(line_units))))
-                continue
+                pending.append((note_id, note, field, line_units))
             elif regen:
-                line_units = convert_lines(units_to_plain(line_units))
+                queue_lines(note_id, note, field, units_to_plain(line_units))
+            else:
+                pending.append((note_id, note, field, line_units))
         else:
             if conv_type == ConvType.REMOVE:
                 continue
-            line_units = convert_lines(lines)
+            queue_lines(note_id, note, field, lines)
 
-        if line_units is None:
-            return
+    converted = convert_lines(conv_lines) if conv_lines else []
+    if converted is None:
+        return
 
-        formatter = fmt_migaku if conv_type == ConvType.MIGAKU else fmt_jrp
-        output_prefs = gv.prefs.output if regen else None
-        update_note("<br>".join(formatter(units, output_prefs) for units in line_units))
+    formatter = fmt_migaku if conv_type == ConvType.MIGAKU else fmt_jrp
+    output_prefs = gv.prefs.output if regen else None
+    for note_id, note, field, units_or_range in pending:
+        if isinstance(units_or_range, tuple):
+            line_units = converted[units_or_range[0]:units_or_range[1]]
+        else:
+            line_units = units_or_range
+
+        if conv_type == ConvType.REMOVE:
+            update_note(note_id, note, field, insert_nbsp("<br>".join(units_to_plain(line_units))))
+        else:
+            update_note(note_id, note, field, "<br>".join(formatter(units, output_prefs) for units in line_units))
 
     backup_msg = ""
     if backup:
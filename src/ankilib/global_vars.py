@@ -1,8 +1,11 @@
 # This project is licensed under the terms of the GNU GPL v3: https://www.gnu.org/licenses/; © 2022 Ben Kerman
 import os.path
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
 from lzma import LZMAError
 from os.path import dirname
-from typing import Optional, Type, TypeVar
+from typing import Optional, Type, TypeVar, Union
 
 import aqt
 from anki.collection import Collection
@@ -10,13 +13,18 @@ from aqt.operations import QueryOp
 
 from .templates import update_all_note_types
 from .util import get_path
-from ..pylib.dictionary import AccentEntry, BasicDict, Dictionary, VariantEntry
-from ..pylib.mecab import Mecab
-from ..pylib.preferences import Prefs
+from ..pylib.dictionary import AccentEntry, BasicDict, Dictionary, LayeredDict, VariantEntry
+from ..pylib.mapped_dict import MappedDict, load_compiled
+from ..pylib.mecab import MecabPool
+from ..pylib.mecab_cache import CachedMecab, mecab_identity
+from ..pylib.preferences import AddonPrefs, Prefs
+from ..pylib.sqlite_dict import SqliteDict, load_sqlite
 from ..pylib.util import ConfigError
 
 T = TypeVar("T")
 
+_WARM_UP_TEXT = "日本語の文章を読んでいます。"
+
 
 def _prefs_path(col: Collection) -> str:
     return os.path.join(dirname(col.path), "jrp-config.json")
@@ -35,11 +43,31 @@ def load_prefs(col: Collection) -> None:
     update_prefs(loaded_prefs or Prefs())
 
 
+def _dict_settings(addon_prefs: AddonPrefs) -> tuple:
+    return addon_prefs.dict_use_sqlite, addon_prefs.dict_sqlite_cache_size
+
+
+def _mecab_settings(addon_prefs: AddonPrefs) -> tuple:
+    return (addon_prefs.mecab_path, addon_prefs.mecab_dict_dir, addon_prefs.mecab_use_system_exe,
+            addon_prefs.mecab_use_system_dict, addon_prefs.mecab_processes, addon_prefs.mecab_use_library,
+            addon_prefs.mecab_cache_size)
+
+
 def update_prefs(new_prefs: Prefs):
     global prefs
+    old_prefs = prefs
     update_all_note_types(aqt.mw.col, new_prefs.addon, prefs and prefs.addon)
     prefs = new_prefs
-    init_mecab()
+    # keep running MeCab processes unless they'd be started differently now
+    if not old_prefs or not mecab_handle or _mecab_settings(old_prefs.addon) != _mecab_settings(new_prefs.addon):
+        init_mecab()
+        start_mecab_warm_up()
+    if not old_prefs or _dict_settings(old_prefs.addon) != _dict_settings(new_prefs.addon):
+        start_dict_load()
+
+    global _idle_timer
+    if _idle_timer is None:
+        _idle_timer = aqt.mw.progress.timer(60 * 1000, _unload_if_idle, True, parent=aqt.mw)
 
 
 def save_prefs():
@@ -56,12 +84,30 @@ def init_mecab():
     global mecab_handle
     exe_path = None if prefs.addon.mecab_use_system_exe else get_path(prefs.addon.mecab_path)
     dir_path = None if prefs.addon.mecab_use_system_dict else get_path(prefs.addon.mecab_dict_dir)
-    mecab_handle = Mecab(exe_path, dir_path)
+    if mecab_handle:
+        mecab_handle.close()
+    pool = MecabPool(exe_path, dir_path, prefs.addon.mecab_processes, prefs.addon.mecab_use_library)
+    os.makedirs(get_path("user_files"), exist_ok=True)
+    mecab_handle = CachedMecab(pool, get_path("user_files", "analysis_cache.sqlite"), mecab_identity(exe_path, dir_path),
+                               disk_size=prefs.addon.mecab_cache_size)
+
+
+def start_mecab_warm_up():
+    handle = mecab_handle
+
+    def failed(e: Exception):
+        # not worth a warning, the first actual analysis reports the problem
+        print(f"JRP MeCab warm-up failed: {e}")
+
+    QueryOp(parent=aqt.mw, op=lambda col: handle.warm_up(_WARM_UP_TEXT), success=lambda _: None) \
+        .failure(failed).run_in_background()
 
 
-def load_dict():
-    def load_data(desc: str, filename: str, entry_t: Type[T]) -> BasicDict[T]:
+def load_dict(addon_prefs: AddonPrefs):
+    def load_base(desc: str, filename: str, entry_t: Type[T]) -> Union[MappedDict[T], SqliteDict[T], BasicDict[T]]:
         path = get_path("data", filename)
+        base_name = os.path.splitext(filename)[0]
+        compiled_path = get_path("user_files", f"{base_name}.jrpd")
         if not os.path.exists(path):
             aqt.mw.taskman.run_on_main(
                 lambda: aqt.utils.showWarning(
@@ -71,8 +117,16 @@ def load_dict():
             )
         else:
             try:
-                return BasicDict(entry_t, path)
-            except (OSError, LZMAError) as e:
+                os.makedirs(dirname(compiled_path), exist_ok=True)
+                if addon_prefs.dict_use_sqlite:
+                    return load_sqlite(entry_t, path, get_path("user_files", f"{base_name}.sqlite"),
+                                       addon_prefs.dict_sqlite_cache_size * 1024)
+                try:
+                    return load_compiled(entry_t, path, compiled_path)
+                except OSError:
+                    # compiled file can't be written or mapped, fall back on a snapshot of the in-memory dict
+                    return BasicDict(entry_t, path, get_path("user_files", f"{base_name}.snapshot"))
+            except (OSError, LZMAError, sqlite3.Error) as e:
                 aqt.mw.taskman.run_on_main(
                     lambda: aqt.utils.showWarning(
                         f"Loading {path} failed, reading/accent generation will not work:\n{e}",
@@ -80,22 +134,79 @@ def load_dict():
                     )
                 )
 
-    acc_dic = load_data("accent", "accents.xz", AccentEntry)
-    var_dic = load_data("variants", "variants.xz", VariantEntry)
+    def load_data(desc: str, filename: str, entry_t: Type[T]) -> Optional[LayeredDict[T]]:
+        # user dictionaries in user_files/accents/*.tsv and user_files/variants/*.tsv take priority over the data
+        if base := load_base(desc, filename, entry_t):
+            return LayeredDict(base, entry_t, get_path("user_files", os.path.splitext(filename)[0]))
+        return None
+
+    # decompression and file I/O release the GIL, so both files can be loaded at the same time
+    with ThreadPoolExecutor(2) as executor:
+        acc_future = executor.submit(load_data, "accent", "accents.xz", AccentEntry)
+        var_future = executor.submit(load_data, "variants", "variants.xz", VariantEntry)
+        acc_dic, var_dic = acc_future.result(), var_future.result()
     if acc_dic and var_dic:
-        global dictionary
+        global dictionary, dict_unloaded, _last_use
+        if dictionary:
+            dictionary.clear_cache()
         dictionary = Dictionary(acc_dic, var_dic)
+        dict_unloaded = False
+        _last_use = time.monotonic()
+
+
+def start_dict_load():
+    global _dict_loading
+    addon_prefs = prefs.addon
+
+    def finished(_):
+        global _dict_loading
+        _dict_loading = False
+        print("JRP data loaded")
+
+    def failed(e: Exception):
+        global _dict_loading
+        _dict_loading = False
+        aqt.utils.showWarning(f"Loading dictionary failed: {e}")
+
+    _dict_loading = True
+    QueryOp(parent=aqt.mw, op=lambda col: load_dict(addon_prefs), success=finished) \
+        .failure(failed).run_in_background()
+
+
+def _unload_if_idle():
+    global dictionary, dict_unloaded, _cheap_reload
+    idle_mins = prefs.addon.dict_unload_after if prefs else 0
+    if dictionary and idle_mins > 0 and time.monotonic() - _last_use >= idle_mins * 60:
+        # mapped files and databases are reopened in milliseconds, an in-memory dictionary
+        # has to be unpickled from its snapshot, which is too slow for the UI thread
+        _cheap_reload = all(getattr(d, "lazy", False) for d in (dictionary.accent, dictionary.variant))
+        dictionary.close()
+        dictionary = None
+        dict_unloaded = True
 
 
 prefs: Optional[Prefs] = None
-mecab_handle: Optional[Mecab] = None
+mecab_handle: Optional[CachedMecab] = None
 dictionary: Optional[Dictionary] = None
-
-QueryOp(parent=aqt.mw, op=lambda col: load_dict(), success=lambda _: print("JRP data loaded")).run_in_background()
+dict_unloaded = False
+_dict_loading = False
+_cheap_reload = False
+_last_use = 0.0
+_idle_timer = None
 
 
 def convert_check() -> bool:
+    global _last_use
+    if not dictionary and dict_unloaded and not _dict_loading:
+        if _cheap_reload:
+            load_dict(prefs.addon)
+        else:
+            start_dict_load()
+            aqt.utils.tooltip("Reloading dictionary, please try again in a moment.")
+            return False
     if not dictionary:
         aqt.utils.showWarning("Dictionary is not (yet) loaded, can't convert.")
         return False
+    dictionary.reload_overlays()
+    _last_use = time.monotonic()
     return True
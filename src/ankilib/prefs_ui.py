@@ -216,7 +216,7 @@ class AccentOverrideWidget(QWidget):
 
         layout = QVBoxLayout(self)
         layout.addWidget(QLabel("Accent Overrides", self))
-        layout.addLayout(_setup_btns(self, lambda: AccentOverride(["漢字"], "よみ", [Accent(0)])))
+        layout.addLayout(_setup_btns(self, lambda: AccentOverride(["漢字"], "よみ", [Accent.pooled(0)])))
         layout.addWidget(self._tbl, 1)
 
     def insert_row(self, r: int, ovrd: AccentOverride):
@@ -114,6 +114,45 @@ addon_defs = [
         "tool": "Ignore the dictionary path from above and use "
                 "the default location compiled into the executable.",
         "type": WidgetType.Checkbox
+    }, {
+        "name": "mecab_processes",
+        "desc": "Number of MeCab processes",
+        "tool": "How many MeCab processes to use when converting many notes at once.\n"
+                "0 uses one per CPU core. Processes are only started when they are needed.",
+        "type": WidgetType.Number
+    }, {
+        "name": "mecab_use_library",
+        "desc": "Run MeCab inside Anki",
+        "tool": "Load the MeCab library directly instead of communicating with separate processes.\n"
+                "The library is searched next to the MeCab executable and then system-wide;\n"
+                "if it can't be loaded the executable is used as before.",
+        "type": WidgetType.Checkbox
+    }, {
+        "name": "mecab_cache_size",
+        "desc": "Analysis cache size (sentences)",
+        "tool": "How many analyzed sentences to keep in the add-on's user_files directory,\n"
+                "so that converting them again doesn't need MeCab. Each takes around 1 KB.\n"
+                "0 only keeps them in memory until Anki is closed.",
+        "type": WidgetType.Number
+    }, {
+        "name": "dict_use_sqlite",
+        "desc": "Keep pitch accent data on disk",
+        "tool": "Look up words in an SQLite database instead of mapping the whole dictionary into memory.\n"
+                "Lookups are slower but memory usage stays within the cache size below.\n"
+                "The database is created in the add-on's user_files directory the first time it is needed.",
+        "type": WidgetType.Checkbox
+    }, {
+        "name": "dict_sqlite_cache_size",
+        "desc": "Database cache size (MiB)",
+        "tool": "Maximum amount of memory SQLite may use to cache dictionary pages.",
+        "type": WidgetType.Number
+    }, {
+        "name": "dict_unload_after",
+        "desc": "Unload dictionary when idle (minutes)",
+        "tool": "Free the memory used by the dictionary after it hasn't been used for this many minutes.\n"
+                "It is loaded again from the add-on's user_files directory on the next conversion.\n"
+                "0 keeps the dictionary loaded for the whole session.",
+        "type": WidgetType.Number
     }
 ]
 
@@ -0,0 +1,79 @@
+#!/bin/python
+# This project is licensed under the terms of the GNU GPL v3: https://www.gnu.org/licenses/; © 2022 Ben Kerman
+import shutil
+import sys
+import time
+import timeit
+
+from pylib.mecab import Mecab, MecabError, MecabUnit, parse_node_lines
+
+# typical output for 日本語の文章を読んでいます。 in the %m\t%ps,%pe,%H node format
+_SAMPLE = [
+    "日本語\t0,9,名詞,一般,*,*,*,*,日本語,ニホンゴ,ニホンゴ",
+    "の\t9,12,助詞,連体化,*,*,*,*,の,ノ,ノ",
+    "文章\t12,18,名詞,一般,*,*,*,*,文章,ブンショウ,ブンショー",
+    "を\t18,21,助詞,格助詞,一般,*,*,*,を,ヲ,ヲ",
+    "読ん\t21,27,動詞,自立,*,*,五段・マ行,連用タ接続,読む,ヨン,ヨン",
+    "で\t27,30,助詞,接続助詞,*,*,*,*,で,デ,デ",
+    "い\t30,33,動詞,非自立,*,*,一段,連用形,いる,イ,イ",
+    "ます\t33,39,助動詞,*,*,*,特殊・マス,基本形,ます,マス,マス",
+    "。\t39,42,記号,句点,*,*,*,*,。,。,。",
+    "ｘｙｚ\t42,51,未知語",
+]
+_SENTENCE = "日本語の文章を読んでいます。ｘｙｚ"
+_SENTENCES = 10000
+
+
+def lean_line(line):
+    # the lean node format is the same without the pronunciation; unknown words are unchanged
+    return line if line.endswith("未知語") else line.rsplit(",", 1)[0]
+
+
+# the converter reads every unit's reading, so it's converted to hiragana in both variants
+def parse_str(lines):
+    return [unit.reading for unit, _, _ in (MecabUnit.from_line(line.decode("utf-8")) for line in lines)]
+
+
+def parse_bytes(lines):
+    return [unit.reading for unit, _, _ in parse_node_lines(lines)]
+
+
+def run_mecab(lean):
+    mecab = Mecab(lean=lean)
+    try:
+        mecab.analyze(_SENTENCE)
+        start = time.perf_counter()
+        for _ in mecab.analyze_many([_SENTENCE] * _SENTENCES):
+            pass
+        return time.perf_counter() - start
+    finally:
+        mecab.close()
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) >= 2 else 10000
+    lines = [line.encode("utf-8") for line in _SAMPLE]
+    lean_lines = [lean_line(line).encode("utf-8") for line in _SAMPLE]
+    for name, fn, ls in (("str", parse_str, lines), ("bytes", parse_bytes, lines),
+                         ("lean", parse_bytes, lean_lines)):
+        secs = min(timeit.repeat(lambda: fn(ls), number=count, repeat=5))
+        print(f"{name:>5}: {secs / (count * len(ls)) * 1e6:.3f} µs per node")
+
+    # the sample is one sentence, so scale it to get the numbers per 10k sentences
+    print(f"per {_SENTENCES} sentences:")
+    sizes = [sum(len(line) + 1 for line in ls) * _SENTENCES for ls in (lines, lean_lines)]
+    print(f" output: {sizes[0] / 1e6:.2f} MB full, {sizes[1] / 1e6:.2f} MB lean, "
+          f"{(sizes[0] - sizes[1]) / 1e6:.2f} MB ({1 - sizes[1] / sizes[0]:.1%}) saved")
+    parse_secs = [min(timeit.repeat(lambda: parse_bytes(ls), number=_SENTENCES, repeat=5))
+                  for ls in (lines, lean_lines)]
+    print(f"  parse: {parse_secs[0] * 1e3:.1f} ms full, {parse_secs[1] * 1e3:.1f} ms lean, "
+          f"{(parse_secs[0] - parse_secs[1]) * 1e3:.1f} ms saved")
+
+    # the time MeCab spends writing the output can only be measured with a real installation
+    if shutil.which("mecab"):
+        try:
+            run_secs = [run_mecab(lean) for lean in (False, True)]
+            print(f"  MeCab: {run_secs[0] * 1e3:.1f} ms full, {run_secs[1] * 1e3:.1f} ms lean, "
+                  f"{(run_secs[0] - run_secs[1]) * 1e3:.1f} ms saved")
+        except MecabError as e:
+            print(f"  MeCab: failed to run: {e}")
@@ -0,0 +1,19 @@
+#!/bin/python
+# This project is licensed under the terms of the GNU GPL v3: https://www.gnu.org/licenses/; © 2022 Ben Kerman
+import os
+import sys
+
+from pylib.dictionary import AccentEntry, VariantEntry
+from pylib.sqlite_dict import build_sqlite_dict
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        sys.exit("invalid number of arguments; usage: ./build_sqlite_dict.py <DATA DIR> <TARGET DIR> [<WORKERS>]")
+
+    src_dir, tgt_dir = sys.argv[1:3]
+    workers = int(sys.argv[3]) if len(sys.argv) >= 4 else 1
+    os.makedirs(tgt_dir, exist_ok=True)
+    build_sqlite_dict(AccentEntry, os.path.join(src_dir, "accents.xz"),
+                      os.path.join(tgt_dir, "accents.sqlite"), workers)
+    build_sqlite_dict(VariantEntry, os.path.join(src_dir, "variants.xz"),
+                      os.path.join(tgt_dir, "variants.sqlite"), workers)
@@ -18,6 +18,7 @@ class ImportEntry(AccentEntry):
 
     def __init__(self, reading: str, variant: str, accents: list[Accent], source: str):
         super().__init__(to_hiragana(reading), [variant], accents)
+        self.variants = list(self.variants)
         if source == "nhk":
             self.sources = ["日"]
         elif source == "daiji":
@@ -56,7 +57,7 @@ def convert_accents(src_entry: list) -> list[Accent]:
             warn(f"zero length accent list: {src_entry[0]}")
             return None
         elif len(acc_nums) == 1:
-            return Accent(acc_nums[0])
+            return Accent.pooled(acc_nums[0])
         else:
             if not nhk_reading:
                 warn(f"missing NHK reading for split accent: {src_entry[0]}; {acc_nums}")
@@ -72,7 +73,7 @@ def convert_accents(src_entry: list) -> list[Accent]:
                 moras = split_moras(reading)
                 parts.append((acc_num, len(moras)))
 
-            return Accent(parts)
+            return Accent.pooled(parts)
 
     if src_entry[4]:
         itr = (convert(nums, rdng[0]) for nums, rdng in zip(src_entry[5], src_entry[4]))
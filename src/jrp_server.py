@@ -0,0 +1,29 @@
+#!/bin/python
+# This project is licensed under the terms of the GNU GPL v3: https://www.gnu.org/licenses/; © 2022 Ben Kerman
+import os
+import sys
+
+from pylib.dictionary import AccentEntry, Dictionary, VariantEntry
+from pylib.mapped_dict import load_compiled
+from pylib.mecab import Mecab
+from pylib.server import ConversionServer, default_socket_path
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        sys.exit("invalid number of arguments; "
+                 "usage: ./jrp_server.py <DATA DIR> <CACHE DIR> [<MECAB INSTANCES>] [<SOCKET PATH>]")
+
+    data_dir, cache_dir = sys.argv[1:3]
+    instances = int(sys.argv[3]) if len(sys.argv) >= 4 else os.cpu_count() or 1
+    sock_path = sys.argv[4] if len(sys.argv) >= 5 else default_socket_path()
+
+    os.makedirs(cache_dir, exist_ok=True)
+    dic = Dictionary(load_compiled(AccentEntry, os.path.join(data_dir, "accents.xz"),
+                                   os.path.join(cache_dir, "accents.jrpd")),
+                     load_compiled(VariantEntry, os.path.join(data_dir, "variants.xz"),
+                                   os.path.join(cache_dir, "variants.jrpd")))
+    with ConversionServer(sock_path, dic, [Mecab() for _ in range(instances)]) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
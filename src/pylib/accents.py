@@ -1,19 +1,46 @@
 # This project is licensed under the terms of the GNU GPL v3: https://www.gnu.org/licenses/; © 2022 Ben Kerman
 from dataclasses import dataclass
-from typing import Any, List, Optional, Tuple, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 from .normalize import split_moras
 from .util import ConfigError
 
 
-@dataclass
+AccentValue = Optional[Union[int, Tuple[Tuple[int, int], ...]]]
+
+_pool: Dict[AccentValue, "Accent"] = {}
+_str_pool: Dict[Tuple[str, Optional[int]], "Accent"] = {}
+
+
+@dataclass(frozen=True)
 class Accent:
-    value: Optional[Union[int, List[Tuple[int, int]]]]
+    __slots__ = ("value", "_hash")
+
+    value: AccentValue
 
     default = False
 
+    def __post_init__(self):
+        if type(self.value) is list:
+            object.__setattr__(self, "value", tuple(tuple(p) for p in self.value))
+        object.__setattr__(self, "_hash", hash(self.value))
+
+    @classmethod
+    def pooled(cls, value: Optional[Union[int, List[Tuple[int, int]], Tuple[Tuple[int, int], ...]]]) -> "Accent":
+        if type(value) is list:
+            value = tuple(tuple(p) for p in value)
+        if (acc := _pool.get(value)) is None:
+            acc = _pool.setdefault(value, cls(value))
+        return acc
+
     @classmethod
     def from_str(cls, val: str, mora_count: Optional[int] = None) -> "Accent":
+        if (acc := _str_pool.get((val, mora_count))) is None:
+            acc = _str_pool.setdefault((val, mora_count), cls._parse_str(val, mora_count))
+        return acc
+
+    @classmethod
+    def _parse_str(cls, val: str, mora_count: Optional[int] = None) -> "Accent":
         def parse_part(v: str) -> Tuple[int, Optional[int]]:
             split = v.split("@")
             if len(split) == 1:
@@ -24,7 +51,7 @@ class Accent:
                 raise ValueError
 
         if val == "?":
-            return Accent(None)
+            return cls.pooled(None)
 
         part_strs = val.split("-")
         if len(part_strs) > 1:
@@ -40,9 +67,9 @@ class Accent:
                     calc_count = mora_count - sum(mc for _, mc in parts[:-1])
                     parts[-1] = (ds_mora, calc_count)
 
-            return Accent(parts)
+            return cls.pooled(parts)
         else:
-            return Accent(int(val))
+            return cls.pooled(int(val))
 
     @classmethod
     def from_list(cls, lst: list) -> "Accent":
@@ -52,14 +79,14 @@ class Accent:
                 items.append(item)
             else:
                 raise ValueError
-        return Accent(items)
+        return cls.pooled(items)
 
     @classmethod
     def from_json(cls, json_val: Any) -> Union["Accent", ConfigError]:
         if json_val is None:
             return ConfigError("accents in config files must not be None")
         if type(json_val) is int:
-            return Accent(json_val)
+            return cls.pooled(json_val)
         elif type(json_val) is list:
             try:
                 return cls.from_list(json_val)
@@ -71,7 +98,7 @@ class Accent:
     def to_json(self, _) -> Union[int, List[Tuple[int, int]]]:
         if self.value is None:
             raise ValueError("None value in config accent")
-        return self.value
+        return self.value if type(self.value) is int else [list(p) for p in self.value]
 
     def __str__(self) -> str:
         if self.value is None:
@@ -85,10 +112,16 @@ class Accent:
         return f"A[{self}]"
 
     def __hash__(self) -> int:
-        if type(self.value) is not list:
-            return hash(self.value)
-        else:
-            return hash(tuple(self.value))
+        return self._hash
+
+    def __reduce__(self):
+        return Accent.pooled, (self.value,)
+
+    def __copy__(self) -> "Accent":
+        return self
+
+    def __deepcopy__(self, _) -> "Accent":
+        return self
 
     def fmt_migaku(self, reading: str, is_yougen: bool) -> str:
         if self.value is None:
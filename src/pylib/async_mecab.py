@@ -0,0 +1,99 @@
+# This project is licensed under the terms of the GNU GPL v3: https://www.gnu.org/licenses/; © 2022 Ben Kerman
+import asyncio
+from asyncio.subprocess import PIPE, Process
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Iterable, List, Optional, Tuple
+
+from .mecab import Mecab, MecabError, ParserUnit, add_gaps, parse_node_lines
+
+
+_Pending = Deque[Tuple[bytes, "asyncio.Future[List[ParserUnit]]"]]
+
+
+@dataclass
+class AsyncMecab:
+    exe_path: Optional[str] = None
+    dic_dir: Optional[str] = None
+    timeout: Optional[float] = None
+    lean: bool = True
+    _proc: Optional[Process] = field(default=None, init=False)
+    _reader: Optional["asyncio.Task[None]"] = field(default=None, init=False)
+    # requests in the order they were written to the current process, which answers them in the same order
+    _pending: _Pending = field(default_factory=deque, init=False)
+    _spawn_lock: Optional[asyncio.Lock] = field(default=None, init=False)
+
+    async def _instance(self) -> Tuple[Process, _Pending]:
+        # created here so that it belongs to the running loop
+        if self._spawn_lock is None:
+            self._spawn_lock = asyncio.Lock()
+        async with self._spawn_lock:
+            if self._proc is None or self._proc.returncode is not None:
+                args, kwargs = Mecab(self.exe_path, self.dic_dir, self.lean)._command()
+                try:
+                    proc = await asyncio.create_subprocess_exec(*args, stdin=PIPE, stdout=PIPE, **kwargs)
+                except FileNotFoundError:
+                    raise MecabError("executable not found")
+                self._proc = proc
+                self._pending = deque()
+                self._reader = asyncio.ensure_future(self._read_results(proc, self._pending))
+            return self._proc, self._pending
+
+    @staticmethod
+    async def _read_results(proc: Process, pending: _Pending):
+        lines: List[bytes] = []
+        while line := await proc.stdout.readline():
+            line = line.rstrip(b"\r\n")
+            if line != b"EOS":
+                lines.append(line)
+                continue
+
+            utf8_bytes, fut = pending.popleft()
+            if not fut.done():
+                try:
+                    fut.set_result(add_gaps(utf8_bytes, parse_node_lines(lines)))
+                except MecabError as e:
+                    fut.set_exception(e)
+            lines = []
+
+        _fail_pending(pending, MecabError("MeCab exited unexpectedly"))
+
+    def close(self):
+        if self._reader is not None:
+            self._reader.cancel()
+            self._reader = None
+        if self._proc is not None and self._proc.returncode is None:
+            self._proc.kill()
+        self._proc = None
+        _fail_pending(self._pending, MecabError("MeCab was closed"))
+
+    async def analyze(self, txt: str) -> List[ParserUnit]:
+        utf8_bytes = Mecab._encode(txt)
+        proc, pending = await self._instance()
+        fut = asyncio.get_running_loop().create_future()
+        # queueing and writing without awaiting in between keeps requests and results in the same order
+        pending.append((utf8_bytes, fut))
+        proc.stdin.write(utf8_bytes + b"\n")
+        try:
+            await proc.stdin.drain()
+            return await asyncio.wait_for(asyncio.shield(fut), self.timeout)
+        except asyncio.TimeoutError:
+            fut.cancel()
+            # a process that doesn't answer can't be trusted with the requests queued after this one
+            if self._proc is proc:
+                self.close()
+            raise MecabError("timed out waiting for MeCab")
+        except (BrokenPipeError, ConnectionResetError):
+            if self._proc is proc:
+                self.close()
+            raise MecabError("MeCab exited unexpectedly")
+
+    async def analyze_many(self, lines: Iterable[str]) -> List[List[ParserUnit]]:
+        return list(await asyncio.gather(*(self.analyze(line) for line in lines)))
+
+
+def _fail_pending(pending: _Pending, error: MecabError):
+    while pending:
+        _, fut = pending.popleft()
+        if not fut.done():
+            fut.set_exception(error)
@@ -0,0 +1,35 @@
+# This project is licensed under the terms of the GNU GPL v3: https://www.gnu.org/licenses/; © 2022 Ben Kerman
+import math
+from typing import Hashable, Iterable, Iterator
+
+
+class BloomFilter:
+    _size: int
+    _hash_count: int
+    _bits: bytearray
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(capacity, 1)
+        self._size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 64)
+        self._hash_count = max(round(self._size / capacity * math.log(2)), 1)
+        self._bits = bytearray((self._size + 7) // 8)
+
+    def _positions(self, key: Hashable) -> Iterator[int]:
+        # double hashing (Kirsch-Mitzenmacher) on the two halves of the built-in hash,
+        # which is fine as long as the filter isn't persisted across processes
+        h = hash(key)
+        h1 = h & 0xffffffff
+        h2 = (h >> 32) & 0xffffffff | 1
+        for i in range(self._hash_count):
+            yield (h1 + i * h2) % self._size
+
+    def add(self, key: Hashable):
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def update(self, keys: Iterable[Hashable]):
+        for key in keys:
+            self.add(key)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
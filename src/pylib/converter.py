@@ -38,6 +38,15 @@ def base_for_potential(word: str, reading: Optional[str]) -> Optional[Tuple[str,
         return None
 
 
+def _can_extend(prefs: ConvPrefs, dic: Dictionary, word: str) -> bool:
+    # a longer match has to start with the current word, except for a potential form
+    # (読める → 読む) where the following unit is just る and the last character changes
+    if dic.has_prefix(word) or prefs.word_or_has_prefix(word):
+        return True
+    pot_prefix = word[:-1] + word[-1].translate(_potential_table)
+    return pot_prefix != word and dic.has_prefix(pot_prefix)
+
+
 def _lookup_variants(p: ConvPrefs, word: str, reading_guess: Optional[str],
                      base_word: Optional[str] = None) -> Iterable[Tuple[str, Optional[str], Optional[str]]]:
     def pot(word: str, reading: Optional[str]) -> Optional[Tuple[str, str, str]]:
@@ -89,6 +98,9 @@ def find_longest_match(prefs: ConvPrefs, dic: Dictionary, idx: int, punits: Sequ
                     plain_match = match
                 break
 
+        if not _can_extend(prefs, dic, word):
+            break
+
     def find_retval(prefs: ConvPrefs, acc: Match, plain: Match) -> Match:
         if acc:
             if prefs.prefer_accent_lookups:
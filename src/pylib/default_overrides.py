@@ -33,6 +33,6 @@ word = [
 ]
 
 accent = [
-    DefaultOverride(0, AccentOverride(["する"], "する", [Accent(0)])),
-    DefaultOverride(1, AccentOverride(["巨人"], "きょじん", [Accent(0)]))
+    DefaultOverride(0, AccentOverride(["する"], "する", [Accent.pooled(0)])),
+    DefaultOverride(1, AccentOverride(["巨人"], "きょじん", [Accent.pooled(0)]))
 ]
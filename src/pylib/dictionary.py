@@ -1,51 +1,292 @@
 # This project is licensed under the terms of the GNU GPL v3: https://www.gnu.org/licenses/; © 2022 Ben Kerman
+import hashlib
 import lzma
+import os
+import pickle
 import sys
-from dataclasses import dataclass
-from typing import Dict, Generic, Iterable, List, Optional, Sequence, TextIO, Type, TypeVar
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import chain, repeat
+from typing import Any, Collection, Dict, Generic, Iterable, Iterator, List, Optional, Sequence, Set, TextIO, Tuple, \
+    Type, TypeVar
 
 from .accents import Accent
+from .bloom import BloomFilter
 from .normalize import is_kana, to_hiragana
+from .prefix_index import PrefixIndex
+from .util import warn
 
 T = TypeVar("T")
 
+_SNAPSHOT_VERSION = 5
+
+
+def _parse_line(entry_type: Type[T], line: str) -> Optional[T]:
+    try:
+        return entry_type.from_line(line)
+    except ValueError:
+        print(f"skipping invalid dict entry: {line}")
+        return None
+
+
+def _parse_chunk(entry_type: Type[T], lines: List[str]) -> List[Optional[T]]:
+    return [_parse_line(entry_type, line) for line in lines]
+
+
+def iter_entries(entry_type: Type[T], path, workers: int = 1) -> Iterator[Tuple[str, T]]:
+    fd: TextIO
+    # user dictionaries are plain text, the bundled data is compressed
+    opener = lzma.open if os.fspath(path).endswith(".xz") else open
+    with opener(path, "rt", encoding="utf-8") as fd:
+        lines = (line for line in (rl.rstrip("\r\n") for rl in fd) if not line.startswith("#"))
+        if workers <= 1:
+            for line in lines:
+                if (entry := _parse_line(entry_type, line)) is not None:
+                    yield line, entry
+            return
+        lines = list(lines)
+
+    # several chunks per worker so that a slow chunk doesn't hold up the others
+    chunk_size = max(len(lines) // (workers * 4), 1)
+    chunks = [lines[i:i + chunk_size] for i in range(0, len(lines), chunk_size)]
+    with ProcessPoolExecutor(workers) as executor:
+        for chunk, entries in zip(chunks, executor.map(_parse_chunk, repeat(entry_type), chunks)):
+            yield from ((line, entry) for line, entry in zip(chunk, entries) if entry is not None)
 
-class BasicDict(Generic[T]):
-    _readings: Dict[str, List[T]]
-    _variants: Dict[str, List[T]]
 
-    def __init__(self, entry_type: Type[T], path):
+def file_stamp(path) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def file_digest(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fd:
+        while chunk := fd.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class EntryCollector(Generic[T]):
+    # target for dict_insert when building one of the on-disk formats
+    variants: Dict[str, List[T]]
+    readings: Dict[str, List[T]]
+
+    def __init__(self):
         self.variants = {}
         self.readings = {}
 
-        fd: TextIO
-        with lzma.open(path, "rt", encoding="utf-8") as fd:
-            for line in (rl.rstrip("\r\n") for rl in fd):
-                if line.startswith("#"):
-                    continue
 
-                try:
-                    entry = entry_type.from_line(line)
-                    entry_type.dict_insert(self, entry)
-                except ValueError:
-                    print(f"skipping invalid dict entry: {line}")
+def _snapshot_key(entry_type: Type[T], path) -> Tuple[str, int, int, str]:
+    return (entry_type.__qualname__, *file_stamp(path), file_digest(path))
+
 
-    def look_up_variant(self, val: str) -> Optional[List[T]]:
+class BasicDict(Generic[T]):
+    readings: Dict[str, Sequence[T]]
+    variants: Dict[str, Sequence[T]]
+    _reading_index: Optional[PrefixIndex] = None
+    _variant_index: Optional[PrefixIndex] = None
+
+    def __init__(self, entry_type: Type[T], path, snapshot_path=None, workers: int = 1):
+        self.variants = {}
+        self.readings = {}
+
+        key = _snapshot_key(entry_type, path) if snapshot_path else None
+        if key and self._load_snapshot(snapshot_path, key):
+            return
+
+        for _, entry in iter_entries(entry_type, path, workers):
+            entry_type.dict_insert(self, entry)
+        self._freeze()
+
+        if key:
+            self._save_snapshot(snapshot_path, key)
+
+    def _freeze(self):
+        self.readings = {k: tuple(v) for k, v in self.readings.items()}
+        self.variants = {k: tuple(v) for k, v in self.variants.items()}
+
+    def _load_snapshot(self, path, key: tuple) -> bool:
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path, "rb") as fd:
+                if pickle.load(fd) != (_SNAPSHOT_VERSION, key):
+                    return False
+                readings, variants = pickle.load(fd)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError) as e:
+            warn(f"discarding unreadable dictionary snapshot {path}: {e}")
+            return False
+        self.readings = readings
+        self.variants = variants
+        return True
+
+    def _save_snapshot(self, path, key: tuple):
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "wb") as fd:
+                pickle.dump((_SNAPSHOT_VERSION, key), fd, pickle.HIGHEST_PROTOCOL)
+                pickle.dump((self.readings, self.variants), fd, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            warn(f"failed to write dictionary snapshot {path}: {e}")
+
+    def look_up_variant(self, val: str) -> Optional[Sequence[T]]:
         return self.variants.get(val)
 
-    def look_up_reading(self, val: str) -> Optional[List[T]]:
+    def look_up_reading(self, val: str) -> Optional[Sequence[T]]:
         return self.readings.get(to_hiragana(val))
 
+    def keys(self, as_reading: bool = False) -> Collection[str]:
+        return (self.readings if as_reading else self.variants).keys()
+
+    def _prefix_index(self, as_reading: bool) -> PrefixIndex:
+        if as_reading:
+            if self._reading_index is None:
+                self._reading_index = PrefixIndex(self.readings)
+            return self._reading_index
+        else:
+            if self._variant_index is None:
+                self._variant_index = PrefixIndex(self.variants)
+            return self._variant_index
+
+    def has_prefix(self, prefix: str, as_reading: bool = False) -> bool:
+        return self._prefix_index(as_reading).has_prefix(to_hiragana(prefix) if as_reading else prefix)
+
+    def common_prefixes(self, text: str, as_reading: bool = False) -> List[int]:
+        return self._prefix_index(as_reading).common_prefixes(to_hiragana(text) if as_reading else text)
+
+
+class _LayerKeys(Collection[str]):
+    def __init__(self, colls: Sequence[Collection[str]]):
+        self._colls = colls
+
+    def __len__(self) -> int:
+        # may count keys more than once, which is fine for sizing the Bloom filter
+        return sum(len(c) for c in self._colls)
+
+    def __iter__(self) -> Iterator[str]:
+        return chain.from_iterable(self._colls)
+
+    def __contains__(self, key: object) -> bool:
+        return any(key in c for c in self._colls)
+
+
+class LayeredDict(Generic[T]):
+    # user dictionaries (*.tsv in the same format as the bundled data) stacked over a base dictionary;
+    # files later in name order take priority, and an entry hides entries from lower layers that have
+    # the same reading and share a variant with it
+    base: Any
+    _entry_type: Type[T]
+    _dir: str
+    _layers: Dict[str, Tuple[Tuple[int, int], BasicDict[T]]]
+    _order: List[BasicDict[T]]
+
+    def __init__(self, base, entry_type: Type[T], overlay_dir):
+        self.base = base
+        self._entry_type = entry_type
+        self._dir = os.fspath(overlay_dir)
+        self._layers = {}
+        self._order = []
+        self.reload()
+
+    @property
+    def lazy(self) -> bool:
+        return getattr(self.base, "lazy", False)
+
+    def reload(self) -> Set[str]:
+        try:
+            names = sorted(n for n in os.listdir(self._dir) if n.endswith(".tsv"))
+        except OSError:
+            names = []
+
+        changed: Set[str] = set()
+        layers = {}
+        for name in names:
+            path = os.path.join(self._dir, name)
+            old = self._layers.get(name)
+            try:
+                st = os.stat(path)
+                stamp = st.st_size, st.st_mtime_ns
+                if old and old[0] == stamp:
+                    layers[name] = old
+                    continue
+                layer = BasicDict(self._entry_type, path)
+            except (OSError, UnicodeDecodeError) as e:
+                warn(f"failed to load user dictionary {path}: {e}")
+                continue
+            layers[name] = stamp, layer
+            changed.update(layer.variants, layer.readings)
+        for name, (_, layer) in self._layers.items():
+            if layers.get(name, (None, None))[1] is not layer:
+                changed.update(layer.variants, layer.readings)
+
+        self._layers = layers
+        self._order = [layers[n][1] for n in reversed(names) if n in layers]
+        return changed
+
+    def _merge(self, lookups: Iterable[Optional[Sequence[T]]]) -> Optional[Sequence[T]]:
+        results = [r for r in lookups if r]
+        if len(results) <= 1:
+            return results[0] if results else None
+
+        merged: List[T] = list(results[0])
+        for entries in results[1:]:
+            merged.extend([e for e in entries if not any(
+                m.hira_reading == e.hira_reading and any(v in m.variants for v in e.variants) for m in merged)])
+        return tuple(merged)
+
+    def look_up_variant(self, val: str) -> Optional[Sequence[T]]:
+        if not self._order:
+            return self.base.look_up_variant(val)
+        return self._merge(chain((layer.look_up_variant(val) for layer in self._order),
+                                 (self.base.look_up_variant(val),)))
+
+    def look_up_reading(self, val: str) -> Optional[Sequence[T]]:
+        if not self._order:
+            return self.base.look_up_reading(val)
+        return self._merge(chain((layer.look_up_reading(val) for layer in self._order),
+                                 (self.base.look_up_reading(val),)))
+
+    def keys(self, as_reading: bool = False) -> Collection[str]:
+        return _LayerKeys([d.keys(as_reading) for d in (*self._order, self.base)])
+
+    def has_prefix(self, prefix: str, as_reading: bool = False) -> bool:
+        return any(d.has_prefix(prefix, as_reading) for d in (*self._order, self.base))
+
+    def common_prefixes(self, text: str, as_reading: bool = False) -> List[int]:
+        if not self._order:
+            return self.base.common_prefixes(text, as_reading)
+        return sorted(set(chain.from_iterable(d.common_prefixes(text, as_reading) for d in (*self._order, self.base))))
+
+    def close(self):
+        self._layers.clear()
+        self._order.clear()
+        if close := getattr(self.base, "close", None):
+            close()
+
 
 class AccentEntry:
+    __slots__ = ("reading", "hira_reading", "variants", "accents", "_result")
+
     reading: str
-    variants: List[str]
+    hira_reading: str
+    variants: Sequence[str]
     accents: List[Accent]
+    _result: Optional["LookupResult"]
 
     def __init__(self, reading: str, variants: Iterable[str], accents: List[Accent]):
         self.reading = sys.intern(reading)
-        self.variants = [sys.intern(v) for v in variants]
+        self.hira_reading = sys.intern(to_hiragana(reading))
+        self.variants = tuple(sys.intern(v) for v in variants)
         self.accents = accents
+        self._result = None
+
+    def lookup_result(self) -> "LookupResult":
+        if self._result is None:
+            self._result = LookupResult(self.reading, self.accents)
+        return self._result
 
     @classmethod
     def from_line(cls, line: str) -> "AccentEntry":
@@ -57,18 +298,29 @@ class AccentEntry:
 
     @classmethod
     def dict_insert(cls, bdict, entry):
-        bdict.readings.setdefault(entry.reading, []).append(entry)
+        bdict.readings.setdefault(entry.hira_reading, []).append(entry)
         for var in entry.variants:
             bdict.variants.setdefault(var, []).append(entry)
 
 
 class VariantEntry:
+    __slots__ = ("reading", "hira_reading", "variants", "_result")
+
     reading: str
-    variants: List[str]
+    hira_reading: str
+    variants: Sequence[str]
+    _result: Optional["LookupResult"]
 
-    def __init__(self, reading: str, variants: List[str]):
-        self.variants = [sys.intern(v) for v in variants]
+    def __init__(self, reading: str, variants: Iterable[str]):
+        self.variants = tuple(sys.intern(v) for v in variants)
         self.reading = sys.intern(reading)
+        self.hira_reading = sys.intern(to_hiragana(reading))
+        self._result = None
+
+    def lookup_result(self) -> "LookupResult":
+        if self._result is None:
+            self._result = LookupResult(self.reading)
+        return self._result
 
     @classmethod
     def from_line(cls, line: str) -> "VariantEntry":
@@ -79,7 +331,7 @@ class VariantEntry:
 
     @classmethod
     def dict_insert(cls, bdict, entry):
-        bdict.readings.setdefault(entry.reading, []).append(entry)
+        bdict.readings.setdefault(entry.hira_reading, []).append(entry)
         for var in entry.variants:
             bdict.variants.setdefault(var, []).append(entry)
 
@@ -89,7 +341,7 @@ VariantDict = BasicDict[VariantEntry]
 Entry = TypeVar("Entry", AccentEntry, VariantEntry)
 
 
-@dataclass
+@dataclass(frozen=True)
 class LookupResult:
     reading: str
     accents: Optional[List[Accent]] = None
@@ -98,57 +350,227 @@ class LookupResult:
         return f"R[{self.reading},{self.accents}]"
 
     @classmethod
-    def convert_entries(cls, entries: Iterable[Entry]) -> List["LookupResult"]:
-        return [cls(e.reading, e.accents if isinstance(e, AccentEntry) else None) for e in entries]
+    def convert_entries(cls, entries: Iterable[Entry]) -> Tuple["LookupResult", ...]:
+        return tuple(e.lookup_result() for e in entries)
 
 
-@dataclass
+@dataclass(frozen=True)
 class Lookup:
-    results: List[LookupResult]
+    results: Tuple[LookupResult, ...]
     uncertain: bool = False
+    _has_accents: bool = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "_has_accents", all(r.accents for r in self.results))
 
     def __repr__(self):
-        return f"LU[{self.results}{';uncertain' if self.uncertain else ''}]"
+        return f"LU[{list(self.results)}{';uncertain' if self.uncertain else ''}]"
 
-    def has_accents(self):
-        return all(r.accents for r in self.results)
+    def has_accents(self) -> bool:
+        return self._has_accents
+
+
+@dataclass
+class LookupCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    filtered: int = 0
+
+    def __str__(self):
+        return f"hits: {self.hits}, misses: {self.misses}, evictions: {self.evictions}, filtered: {self.filtered}"
+
+
+_not_cached = object()
+
+
+def _check_uncertain(entrs: Sequence[AccentEntry]) -> bool:
+    return any(e.reading == entrs[0].reading for e in entrs[1:])
+
+
+def _make_lookup(entries: Sequence[AccentEntry]) -> Lookup:
+    return Lookup(LookupResult.convert_entries(entries), _check_uncertain(entries))
+
+
+class _ReadingIndex:
+    __slots__ = ("lookup", "by_reading")
+
+    lookup: Lookup
+    by_reading: Dict[str, Lookup]
+
+    def __init__(self, entries: Sequence[AccentEntry]):
+        self.lookup = _make_lookup(entries)
+        groups: Dict[str, List[AccentEntry]] = {}
+        for e in entries:
+            groups.setdefault(e.hira_reading, []).append(e)
+        if len(groups) == 1:
+            self.by_reading = {entries[0].hira_reading: self.lookup}
+        else:
+            self.by_reading = {r: _make_lookup(es) for r, es in groups.items()}
+
+    def select(self, guess: Optional[str]) -> Lookup:
+        if guess and (selected := self.by_reading.get(guess)):
+            return selected
+        return self.lookup
 
 
 @dataclass
 class Dictionary:
     accent: AccentDict
     variant: VariantDict
+    cache_size: int = 8192
+    use_filter: Optional[bool] = None
+    cache_stats: LookupCacheStats = field(default_factory=LookupCacheStats, init=False, compare=False)
+    _cache: "OrderedDict[Tuple[str, Optional[str]], Any]" = \
+        field(default_factory=OrderedDict, init=False, repr=False, compare=False)
+    # joins and indexes are kept for as many words as the lookup cache, least recently used first out
+    _variant_joins: "OrderedDict[str, Optional[Tuple[AccentEntry, ...]]]" = \
+        field(default_factory=OrderedDict, init=False, repr=False, compare=False)
+    _reading_joins: "OrderedDict[str, Optional[Tuple[AccentEntry, ...]]]" = \
+        field(default_factory=OrderedDict, init=False, repr=False, compare=False)
+    _direct_indexes: "OrderedDict[str, Optional[_ReadingIndex]]" = \
+        field(default_factory=OrderedDict, init=False, repr=False, compare=False)
+    _joined_indexes: "OrderedDict[str, Optional[_ReadingIndex]]" = \
+        field(default_factory=OrderedDict, init=False, repr=False, compare=False)
+    _filter: Optional[BloomFilter] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        dicts = (self.accent, self.variant)
+        if self.use_filter is None:
+            # hashing every key takes seconds, which would undo the instant load of the lazy backends,
+            # and a miss there is only an index search anyway
+            self.use_filter = not any(getattr(d, "lazy", False) for d in dicts)
+        if self.use_filter:
+            self._filter = BloomFilter(sum(len(d.keys(as_reading)) for d in dicts for as_reading in (False, True)))
+            for d in dicts:
+                self._filter.update(d.keys())
+                self._filter.update(d.keys(as_reading=True))
+
+    def _may_contain(self, word: str) -> bool:
+        # variant keys are matched as is and reading keys in hiragana, so this covers every lookup path
+        return self._filter is None or word in self._filter or to_hiragana(word) in self._filter
+
+    def clear_cache(self):
+        self._cache.clear()
+        self._variant_joins.clear()
+        self._reading_joins.clear()
+        self._direct_indexes.clear()
+        self._joined_indexes.clear()
+        self.cache_stats = LookupCacheStats()
+
+    def invalidate(self, keys: Set[str]):
+        # a cached word is stale if it or its hiragana form is a changed key, or if it was
+        # joined over variant entries whose variants include a changed key
+        def stale(word: str, as_reading: bool = False) -> bool:
+            if word in keys or to_hiragana(word) in keys:
+                return True
+            var_ents = (self.variant.look_up_reading if as_reading else self.variant.look_up_variant)(word)
+            return bool(var_ents) and any(var in keys for ve in var_ents for var in ve.variants)
+
+        stale_words = {w for w in chain(self._variant_joins, self._direct_indexes) if stale(w)}
+        stale_words.update(w for w in self._reading_joins if stale(w, as_reading=True))
+        stale_words.update(w for w, _ in self._cache if w in keys or to_hiragana(w) in keys)
+        for cache in (self._variant_joins, self._reading_joins, self._direct_indexes, self._joined_indexes):
+            for word in stale_words.intersection(cache):
+                del cache[word]
+        for key in [k for k in self._cache if k[0] in stale_words]:
+            del self._cache[key]
+        if self._filter is not None:
+            self._filter.update(keys)
+
+    def close(self):
+        # only the mapped and SQLite backends hold resources, the in-memory one is left to the GC
+        self.clear_cache()
+        self._filter = None
+        for d in (self.accent, self.variant):
+            if close := getattr(d, "close", None):
+                close()
+
+    def reload_overlays(self) -> bool:
+        changed: Set[str] = set()
+        for d in (self.accent, self.variant):
+            if isinstance(d, LayeredDict):
+                changed.update(d.reload())
+        if changed:
+            self.invalidate(changed)
+        return bool(changed)
+
+    def _recall(self, table: "OrderedDict[str, Any]", word: str) -> Any:
+        res = table.get(word, _not_cached)
+        if res is not _not_cached:
+            table.move_to_end(word)
+        return res
+
+    def _remember(self, table: "OrderedDict[str, Any]", word: str, value: Any):
+        if self.cache_size > 0:
+            table[word] = value
+            if len(table) > self.cache_size:
+                table.popitem(last=False)
+
+    def _variant_lookup(self, word: str, as_reading: bool = False) -> Optional[Tuple[AccentEntry, ...]]:
+        joins = self._reading_joins if as_reading else self._variant_joins
+        if (res := self._recall(joins, word)) is not _not_cached:
+            return res
 
-    def _variant_lookup(self, word: str, as_reading: bool = False) -> Optional[List[AccentEntry]]:
         lu_fn = self.variant.look_up_reading if as_reading else self.variant.look_up_variant
-        res = []
         var_ents = lu_fn(word)
         if not var_ents:
-            return None
-        for var in (var for ve in var_ents for var in ve.variants):
-            acc_ents = self.accent.look_up_variant(var)
-            if acc_ents:
-                res.extend(acc_ent for acc_ent in acc_ents if acc_ent not in res)
+            res = None
+        else:
+            acc_ents = (self.accent.look_up_variant(var) for ve in var_ents for var in ve.variants)
+            res = tuple(dict.fromkeys(acc_ent for aes in acc_ents if aes for acc_ent in aes))
+        self._remember(joins, word, res)
+        return res
+
+    def _reading_index(self, word: str, joined: bool) -> Optional[_ReadingIndex]:
+        indexes = self._joined_indexes if joined else self._direct_indexes
+        if (res := self._recall(indexes, word)) is not _not_cached:
+            return res
+
+        entries = self._variant_lookup(word) if joined else self.accent.look_up_variant(word)
+        res = _ReadingIndex(entries) if entries else None
+        self._remember(indexes, word, res)
         return res
 
+    def has_prefix(self, prefix: str) -> bool:
+        return self.accent.has_prefix(prefix) or self.variant.has_prefix(prefix) \
+               or self.accent.has_prefix(prefix, as_reading=True) or self.variant.has_prefix(prefix, as_reading=True)
+
+    def common_prefixes(self, text: str) -> List[int]:
+        lengths = set(self.accent.common_prefixes(text))
+        lengths.update(self.variant.common_prefixes(text))
+        lengths.update(self.accent.common_prefixes(text, as_reading=True))
+        lengths.update(self.variant.common_prefixes(text, as_reading=True))
+        return sorted(lengths)
+
     def look_up(self, word: str, reading_guess: Optional[str] = None) -> Optional[Lookup]:
-        def filter_for_guess(entries: Iterable[Entry], guess: Optional[str]) -> Optional[List[Entry]]:
-            if not guess:
-                return None
-            return [e for e in entries if to_hiragana(e.reading) == to_hiragana(guess)]
-
-        def check_uncertain(entrs: Sequence[AccentEntry]) -> bool:
-            return any(e.reading == entrs[0].reading for e in entrs[1:])
-
-        word_direct_aent = self.accent.look_up_variant(word)
-        if word_direct_aent:
-            filtered_aent = filter_for_guess(word_direct_aent, reading_guess) or word_direct_aent
-            return Lookup(LookupResult.convert_entries(filtered_aent), check_uncertain(filtered_aent))
-
-        word_var_aent = self._variant_lookup(word)
-        if word_var_aent:
-            filtered_aent = filter_for_guess(word_var_aent, reading_guess) or word_var_aent
-            return Lookup(LookupResult.convert_entries(filtered_aent), check_uncertain(filtered_aent))
+        if not self._may_contain(word):
+            self.cache_stats.filtered += 1
+            return None
+
+        if self.cache_size <= 0:
+            return self._look_up(word, reading_guess)
+
+        key = (word, reading_guess)
+        res = self._cache.get(key, _not_cached)
+        if res is not _not_cached:
+            self._cache.move_to_end(key)
+            self.cache_stats.hits += 1
+            return res
+
+        self.cache_stats.misses += 1
+        res = self._cache[key] = self._look_up(word, reading_guess)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+            self.cache_stats.evictions += 1
+        return res
+
+    def _look_up(self, word: str, reading_guess: Optional[str] = None) -> Optional[Lookup]:
+        guess_hira = to_hiragana(reading_guess) if reading_guess else None
+
+        for joined in (False, True):
+            if rdng_idx := self._reading_index(word, joined):
+                return rdng_idx.select(guess_hira)
 
         current_lu: Optional[Lookup] = None
         read_direct_aent = self.accent.look_up_reading(word)
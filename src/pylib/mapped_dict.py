@@ -0,0 +1,254 @@
+# This project is licensed under the terms of the GNU GPL v3: https://www.gnu.org/licenses/; © 2022 Ben Kerman
+import mmap
+import os
+import struct
+from array import array
+from collections import OrderedDict
+from typing import BinaryIO, Collection, Dict, Iterator, Generic, List, NamedTuple, Optional, Sequence, Tuple, Type, \
+    TypeVar
+
+from .dictionary import AccentEntry, Dictionary, EntryCollector, VariantEntry, file_stamp, iter_entries
+from .normalize import to_hiragana
+
+T = TypeVar("T")
+
+# layout (native byte order, all offsets relative to the start of the file):
+#   header: magic, format version, byte order mark, source file size, source file mtime (ns)
+#   section table: (offset, length) for each of the sections below
+#   entries: uint32 line offsets (n + 1), UTF-8 source lines
+#   variant/reading index: uint32 key offsets (k + 1), UTF-8 keys sorted bytewise,
+#                          uint32 posting offsets (k + 1), uint32 entry indices
+_MAGIC = b"JRPD"
+_VERSION = 2
+_BOM = 0x01020304
+_HEADER = struct.Struct("=4sIIqq")
+_SECTION_COUNT = 10
+_SECTIONS = struct.Struct(f"={_SECTION_COUNT * 2}Q")
+
+
+class _KeyIndex:
+    _key_offs: memoryview
+    _keys: memoryview
+    _post_offs: memoryview
+    _postings: memoryview
+
+    def __init__(self, key_offs: memoryview, keys: memoryview, post_offs: memoryview, postings: memoryview):
+        self._key_offs = key_offs.cast("I")
+        self._keys = keys
+        self._post_offs = post_offs.cast("I")
+        self._postings = postings.cast("I")
+
+    def __len__(self) -> int:
+        return len(self._key_offs) - 1
+
+    def __iter__(self) -> Iterator[str]:
+        return (self.key(i).decode("utf-8") for i in range(len(self)))
+
+    def key(self, idx: int) -> bytes:
+        return bytes(self._keys[self._key_offs[idx]:self._key_offs[idx + 1]])
+
+    def lower_bound(self, key: bytes, lo: int = 0) -> int:
+        hi = len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find(self, key: bytes) -> Optional[Sequence[int]]:
+        i = self.lower_bound(key)
+        if i < len(self) and self.key(i) == key:
+            return self._postings[self._post_offs[i]:self._post_offs[i + 1]]
+        return None
+
+    def has_prefix(self, prefix: bytes) -> bool:
+        i = self.lower_bound(prefix)
+        return i < len(self) and self.key(i).startswith(prefix)
+
+    def common_prefixes(self, text: str) -> List[int]:
+        lengths = []
+        lo = 0
+        for n in range(1, len(text) + 1):
+            prefix = text[:n].encode("utf-8")
+            lo = self.lower_bound(prefix, lo)
+            if lo >= len(self) or not (key := self.key(lo)).startswith(prefix):
+                break
+            if key == prefix:
+                lengths.append(n)
+        return lengths
+
+    def release(self):
+        for mv in (self._key_offs, self._keys, self._post_offs, self._postings):
+            mv.release()
+
+
+class MappedDict(Generic[T]):
+    _entry_type: Type[T]
+    _buf: memoryview
+    _line_offs: memoryview
+    _lines: memoryview
+    _variants: _KeyIndex
+    _readings: _KeyIndex
+    _entries: "OrderedDict[int, T]"
+    _entry_cache_size: int
+    _mmap: Optional[mmap.mmap] = None
+    path: Optional[str] = None
+    lazy = True
+
+    def __init__(self, entry_type: Type[T], buf, entry_cache_size: int = 65536):
+        self._entry_type = entry_type
+        magic, version, bom, _, _ = _HEADER.unpack_from(buf)
+        if magic != _MAGIC or version != _VERSION or bom != _BOM:
+            raise ValueError("incompatible compiled dictionary")
+        self._buf = memoryview(buf)
+
+        secs = _SECTIONS.unpack_from(self._buf, _HEADER.size)
+        views = [self._buf[secs[i]:secs[i] + secs[i + 1]] for i in range(0, len(secs), 2)]
+        self._line_offs = views[0].cast("I")
+        self._lines = views[1]
+        self._variants = _KeyIndex(*views[2:6])
+        self._readings = _KeyIndex(*views[6:10])
+        self._entries = OrderedDict()
+        self._entry_cache_size = entry_cache_size
+
+    @classmethod
+    def open(cls, entry_type: Type[T], path) -> "MappedDict[T]":
+        with open(path, "rb") as fd:
+            mm = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            inst = cls(entry_type, mm)
+        except (ValueError, struct.error, TypeError):
+            mm.close()
+            raise ValueError("invalid compiled dictionary")
+        inst._mmap = mm
+        inst.path = os.fspath(path)
+        return inst
+
+    def close(self):
+        self._entries.clear()
+        self._variants.release()
+        self._readings.release()
+        self._line_offs.release()
+        self._lines.release()
+        self._buf.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def source_stamp(self) -> Tuple[int, int]:
+        _, _, _, size, mtime = _HEADER.unpack_from(self._buf)
+        return size, mtime
+
+    def _entry(self, idx: int) -> T:
+        # entries are compared by identity, so the same index has to map to the same object
+        entry = self._entries.get(idx)
+        if entry is None:
+            line = bytes(self._lines[self._line_offs[idx]:self._line_offs[idx + 1]]).decode("utf-8")
+            entry = self._entries[idx] = self._entry_type.from_line(line)
+            if len(self._entries) > self._entry_cache_size:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(idx)
+        return entry
+
+    def _look_up(self, index: _KeyIndex, val: str) -> Optional[List[T]]:
+        postings = index.find(val.encode("utf-8"))
+        return [self._entry(i) for i in postings] if postings else None
+
+    def look_up_variant(self, val: str) -> Optional[List[T]]:
+        return self._look_up(self._variants, val)
+
+    def look_up_reading(self, val: str) -> Optional[List[T]]:
+        return self._look_up(self._readings, to_hiragana(val))
+
+    def keys(self, as_reading: bool = False) -> Collection[str]:
+        return self._readings if as_reading else self._variants
+
+    def has_prefix(self, prefix: str, as_reading: bool = False) -> bool:
+        if as_reading:
+            return self._readings.has_prefix(to_hiragana(prefix).encode("utf-8"))
+        return self._variants.has_prefix(prefix.encode("utf-8"))
+
+    def common_prefixes(self, text: str, as_reading: bool = False) -> List[int]:
+        if as_reading:
+            return self._readings.common_prefixes(to_hiragana(text))
+        return self._variants.common_prefixes(text)
+
+
+def compile_dict(entry_type: Type[T], src_path, tgt_path, workers: int = 1):
+    lines = array("I", [0])
+    line_blob = bytearray()
+    indices: Dict[int, int] = {}
+    coll: EntryCollector[T] = EntryCollector()
+    for line, entry in iter_entries(entry_type, src_path, workers):
+        indices[id(entry)] = len(lines) - 1
+        line_blob += line.encode("utf-8")
+        lines.append(len(line_blob))
+        entry_type.dict_insert(coll, entry)
+
+    def build_index(dic: Dict[str, List[T]]) -> List[bytes]:
+        key_offs = array("I", [0])
+        keys = bytearray()
+        post_offs = array("I", [0])
+        postings = array("I")
+        for key, entries in sorted((k.encode("utf-8"), v) for k, v in dic.items()):
+            keys += key
+            key_offs.append(len(keys))
+            postings.extend(indices[id(e)] for e in entries)
+            post_offs.append(len(postings))
+        return [key_offs.tobytes(), bytes(keys), post_offs.tobytes(), postings.tobytes()]
+
+    sections = [lines.tobytes(), bytes(line_blob), *build_index(coll.variants), *build_index(coll.readings)]
+    size, mtime = file_stamp(src_path)
+
+    def write_aligned(fd: BinaryIO, data: bytes) -> int:
+        pos = fd.tell()
+        fd.write(b"\0" * (-pos % 8))
+        fd.write(data)
+        return pos + (-pos % 8)
+
+    tmp_path = f"{tgt_path}.tmp"
+    with open(tmp_path, "wb") as fd:
+        fd.write(_HEADER.pack(_MAGIC, _VERSION, _BOM, size, mtime))
+        fd.write(b"\0" * _SECTIONS.size)
+        table = []
+        for sec in sections:
+            table.extend((write_aligned(fd, sec), len(sec)))
+        fd.seek(_HEADER.size)
+        fd.write(_SECTIONS.pack(*table))
+    os.replace(tmp_path, tgt_path)
+
+
+def load_compiled(entry_type: Type[T], src_path, tgt_path, workers: int = 1) -> MappedDict[T]:
+    if os.path.exists(tgt_path):
+        try:
+            mdict = MappedDict.open(entry_type, tgt_path)
+            if mdict.source_stamp() == file_stamp(src_path):
+                return mdict
+            mdict.close()
+        except ValueError:
+            pass
+
+    compile_dict(entry_type, src_path, tgt_path, workers)
+    return MappedDict.open(entry_type, tgt_path)
+
+
+class SharedDictionary(NamedTuple):
+    # picklable description of a dictionary backed by compiled files; every process that
+    # opens it maps the same pages, so the data is only held once by the OS page cache
+    accent_path: str
+    variant_path: str
+
+    @classmethod
+    def of(cls, dic: Dictionary) -> "SharedDictionary":
+        if not (isinstance(dic.accent, MappedDict) and dic.accent.path and
+                isinstance(dic.variant, MappedDict) and dic.variant.path):
+            raise ValueError("dictionary is not backed by compiled files")
+        return cls(dic.accent.path, dic.variant.path)
+
+    def open(self, cache_size: int = 8192) -> Dictionary:
+        return Dictionary(MappedDict.open(AccentEntry, self.accent_path),
+                          MappedDict.open(VariantEntry, self.variant_path),
+                          cache_size)
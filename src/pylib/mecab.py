@@ -1,26 +1,48 @@
 # This project is licensed under the terms of the GNU GPL v3: https://www.gnu.org/licenses/; © 2022 Ben Kerman
+import ctypes
+import ctypes.util
 import os
 import platform
+import queue
 import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from enum import Enum, auto
 from subprocess import PIPE, Popen
-from typing import List, Optional, Tuple
+from typing import Any, Callable, Dict, IO, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar, Union
 
 from .normalize import is_kana, to_hiragana
 
+T = TypeVar("T")
+U = TypeVar("U")
+
 
 class MecabError(Exception):
     pass
 
 
-@dataclass
+class _MecabExited(MecabError):
+    pass
+
+
 class ParserUnit:
+    __slots__ = ("value",)
+
     value: str
 
+    def __init__(self, value: str):
+        self.value = value
+
     def __repr__(self):
         return f"InputUnit[{self.value}]"
 
+    def __eq__(self, other):
+        return type(other) is type(self) and other.value == self.value
+
+    __hash__ = None
+
 
 class HinsiType(Enum):
     ZYOSI = auto()
@@ -31,17 +53,100 @@ class HinsiType(Enum):
     OTHER = auto()
 
 
-@dataclass
 class MecabUnit(ParserUnit):
+    __slots__ = ("hinsi", "hinsi_class_1", "hinsi_class_2", "hinsi_class_3", "conj_type", "conj_form", "base_form",
+                 "_reading", "_pronunciation", "_katakana")
+
     hinsi: str
-    hinsi_class_1: Optional[str] = None
-    hinsi_class_2: Optional[str] = None
-    hinsi_class_3: Optional[str] = None
-    conj_type: Optional[str] = None
-    conj_form: Optional[str] = None
-    base_form: Optional[str] = None
-    reading: Optional[str] = None
-    pronunciation: Optional[str] = None
+    hinsi_class_1: Optional[str]
+    hinsi_class_2: Optional[str]
+    hinsi_class_3: Optional[str]
+    conj_type: Optional[str]
+    conj_form: Optional[str]
+    base_form: Optional[str]
+    _reading: Optional[str]
+    _pronunciation: Optional[str]
+    _katakana: bool
+
+    def __init__(self, value: str, hinsi: str,
+                 hinsi_class_1: Optional[str] = None,
+                 hinsi_class_2: Optional[str] = None,
+                 hinsi_class_3: Optional[str] = None,
+                 conj_type: Optional[str] = None,
+                 conj_form: Optional[str] = None,
+                 base_form: Optional[str] = None,
+                 reading: Optional[str] = None,
+                 pronunciation: Optional[str] = None):
+        self.value = value
+        self.hinsi = hinsi
+        self.hinsi_class_1 = hinsi_class_1
+        self.hinsi_class_2 = hinsi_class_2
+        self.hinsi_class_3 = hinsi_class_3
+        self.conj_type = conj_type
+        self.conj_form = conj_form
+        self.base_form = base_form
+        self._reading = reading
+        self._pronunciation = pronunciation
+        self._katakana = False
+
+    @classmethod
+    def _from_output(cls, value: str, hinsi: str, hinsi_class_1: Optional[str], hinsi_class_2: Optional[str],
+                     hinsi_class_3: Optional[str], conj_type: Optional[str], conj_form: Optional[str],
+                     base_form: str, kata_reading: str, kata_pronunciation: Optional[str]) -> "MecabUnit":
+        # MeCab outputs readings in katakana, they are only converted when they're actually used
+        unit = object.__new__(cls)
+        unit.value = value
+        unit.hinsi = hinsi
+        unit.hinsi_class_1 = hinsi_class_1
+        unit.hinsi_class_2 = hinsi_class_2
+        unit.hinsi_class_3 = hinsi_class_3
+        unit.conj_type = conj_type
+        unit.conj_form = conj_form
+        unit.base_form = base_form
+        unit._reading = kata_reading
+        unit._pronunciation = kata_pronunciation
+        unit._katakana = True
+        return unit
+
+    def _convert_readings(self):
+        if self._reading is not None:
+            self._reading = to_hiragana(self._reading)
+        if self._pronunciation is not None:
+            self._pronunciation = to_hiragana(self._pronunciation)
+        self._katakana = False
+
+    @property
+    def reading(self) -> Optional[str]:
+        if self._katakana:
+            self._convert_readings()
+        return self._reading
+
+    @reading.setter
+    def reading(self, value: Optional[str]):
+        if self._katakana:
+            self._convert_readings()
+        self._reading = value
+
+    @property
+    def pronunciation(self) -> Optional[str]:
+        if self._katakana:
+            self._convert_readings()
+        return self._pronunciation
+
+    @pronunciation.setter
+    def pronunciation(self, value: Optional[str]):
+        if self._katakana:
+            self._convert_readings()
+        self._pronunciation = value
+
+    def _fields(self) -> tuple:
+        return (self.value, self.hinsi, self.hinsi_class_1, self.hinsi_class_2, self.hinsi_class_3,
+                self.conj_type, self.conj_form, self.base_form, self.reading, self.pronunciation)
+
+    def __eq__(self, other):
+        return type(other) is type(self) and other._fields() == self._fields()
+
+    __hash__ = None
 
     def __repr__(self):
         return "MecabUnit[" \
@@ -98,7 +203,7 @@ class MecabUnit(ParserUnit):
         return self.reading[0:len(self.reading) - i] + self.base_form[len(self.value) - i:]
 
     @classmethod
-    def from_line(cls, line: str) -> Tuple["MecabUnit", int, int]:
+    def from_features(cls, orig: str, fields: Sequence[str]) -> "MecabUnit":
         def raise_on_ast(val: str) -> str:
             if val == "*":
                 raise MecabError("unexpected empty value in unit")
@@ -108,7 +213,26 @@ class MecabUnit(ParserUnit):
         def ast_to_none(val: str) -> Optional[str]:
             return None if val == "*" else val
 
-        # format: %m(表層形)\t%ps,%pe,%H(品詞,品詞細分類1,品詞細分類2,品詞細分類3,活用型,活用形,原形,読み,発音)
+        # %H: 品詞,品詞細分類1,品詞細分類2,品詞細分類3,活用型,活用形,原形,読み,発音 (発音 is missing in the lean format)
+        if len(fields) < 1 or (fields[0] != "未知語" and len(fields) != 8 and len(fields) != 9):
+            raise MecabError(f"invalid number of fields: {orig}\t{','.join(fields)}")
+
+        if fields[0] != "未知語":
+            return cls._from_output(orig, fields[0],
+                                    ast_to_none(fields[1]),
+                                    ast_to_none(fields[2]),
+                                    ast_to_none(fields[3]),
+                                    ast_to_none(fields[4]),
+                                    ast_to_none(fields[5]),
+                                    raise_on_ast(fields[6]),
+                                    raise_on_ast(fields[7]),
+                                    raise_on_ast(fields[8]) if len(fields) == 9 else None)
+        else:
+            return cls(orig, fields[0])
+
+    @classmethod
+    def from_line(cls, line: str) -> Tuple["MecabUnit", int, int]:
+        # format: %m(表層形)\t%ps,%pe,%H
         orig: str
         data: str
         try:
@@ -117,68 +241,390 @@ class MecabUnit(ParserUnit):
             raise MecabError(f"invalid line: {line}")
 
         fields = data.split(",")
-        if len(fields) < 3 or (fields[2] != "未知語" and len(fields) != 11):
+        if len(fields) < 3:
             raise MecabError(f"invalid number of fields: {line}")
+        return cls.from_features(orig, fields[2:]), int(fields[0]), int(fields[1])
+
+
+_UNKNOWN = "未知語".encode("utf-8")
+
+
+class _FieldValues(Dict[bytes, Optional[str]]):
+    # part of speech and conjugation fields only have a few dozen distinct values
+    def __missing__(self, key: bytes) -> str:
+        decoded = sys.intern(key.decode("utf-8"))
+        if len(self) < 4096:
+            self[key] = decoded
+        return decoded
+
+
+_field_values = _FieldValues({b"*": None})
 
-        if fields[2] != "未知語":
-            obj = cls(orig, fields[2],
-                      ast_to_none(fields[3]),
-                      ast_to_none(fields[4]),
-                      ast_to_none(fields[5]),
-                      ast_to_none(fields[6]),
-                      ast_to_none(fields[7]),
-                      raise_on_ast(fields[8]),
-                      to_hiragana(raise_on_ast(fields[9])),
-                      to_hiragana(raise_on_ast(fields[10])))
+# the full format includes all of %H, the lean one leaves out the pronunciation, which the converter doesn't use;
+# unknown words only have the single 未知語 feature, so they always use %H
+_FULL_NODE_FORMAT = "%m\\t%ps,%pe,%H\\n"
+_LEAN_NODE_FORMAT = "%m\\t%ps,%pe,%f[0],%f[1],%f[2],%f[3],%f[4],%f[5],%f[6],%f[7]\\n"
+
+
+def parse_node_lines(lines: Iterable[bytes]) -> Iterator[Tuple[MecabUnit, int, int]]:
+    # same as MecabUnit.from_line, but splits the raw output and only decodes what is needed;
+    # lines in the lean node format lack the pronunciation, which is left empty then
+    for line in lines:
+        surface, sep, data = line.partition(b"\t")
+        fields = data.split(b",")
+        if not sep or len(fields) < 3:
+            raise MecabError(f"invalid line: {line.decode('utf-8', 'replace')}")
+
+        if fields[2] == _UNKNOWN:
+            unit = MecabUnit(surface.decode("utf-8"), "未知語")
+        elif len(fields) != 10 and len(fields) != 11:
+            raise MecabError(f"invalid number of fields: {line.decode('utf-8', 'replace')}")
+        elif b"*" in fields[8:]:
+            raise MecabError("unexpected empty value in unit")
         else:
-            obj = cls(orig, fields[2])
-        return obj, int(fields[0]), int(fields[1])
+            unit = MecabUnit._from_output(surface.decode("utf-8"), _field_values[fields[2]],
+                                          _field_values[fields[3]], _field_values[fields[4]], _field_values[fields[5]],
+                                          _field_values[fields[6]], _field_values[fields[7]],
+                                          fields[8].decode("utf-8"), fields[9].decode("utf-8"),
+                                          fields[10].decode("utf-8") if len(fields) == 11 else None)
+        yield unit, int(fields[0]), int(fields[1])
+
+
+def add_gaps(utf8_bytes: bytes, parsed: Iterable[Tuple[MecabUnit, int, int]]) -> List[ParserUnit]:
+    # MeCab skips whitespace, which is kept as plain units between the analyzed ones
+    units = []
+    last_end = 0
+    for unit, start, end in parsed:
+        if last_end != start:
+            units.append(ParserUnit(utf8_bytes[last_end:start].decode("utf-8")))
+        last_end = end
+        units.append(unit)
+    return units
 
 
 @dataclass
 class Mecab:
     exe_path: Optional[str] = None
     dic_dir: Optional[str] = None
+    lean: bool = True
     _inst: Optional[Popen] = field(default=None, init=False)
+    _closed: bool = field(default=False, init=False)
+
+    def _command(self) -> Tuple[List[str], Dict[str, Any]]:
+        env = os.environ.copy()
+        args = [self.exe_path] if self.exe_path else ["mecab"]
+        args.extend(("--unk-feature=未知語", f"--unk-format={_FULL_NODE_FORMAT}",
+                     f"--node-format={_LEAN_NODE_FORMAT if self.lean else _FULL_NODE_FORMAT}"))
+        if self.exe_path:
+            if platform.system() == "Linux":
+                env["LD_LIBRARY_PATH"] = os.path.dirname(self.exe_path)
+            args.append(f"--rcfile={os.path.join(os.path.dirname(self.exe_path), 'mecabrc')}")
+        if self.dic_dir:
+            args.append(f"--dicdir={self.dic_dir}")
+
+        if platform.system() == "Windows":
+            si = subprocess.STARTUPINFO()
+            si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        else:
+            si = None
+        return args, {"env": env, "startupinfo": si}
 
     def _instance(self) -> Popen:
+        if self._closed:
+            raise MecabError("MeCab was closed")
         if self._inst is None or self._inst.poll() is not None:
-            env = os.environ.copy()
-            args = [self.exe_path] if self.exe_path else ["mecab"]
-            args.extend(("--unk-feature=未知語", "--node-format=%m\\t%ps,%pe,%H\\n"))
-            if self.exe_path:
-                if platform.system() == "Linux":
-                    env["LD_LIBRARY_PATH"] = os.path.dirname(self.exe_path)
-                args.append(f"--rcfile={os.path.join(os.path.dirname(self.exe_path), 'mecabrc')}")
-            if self.dic_dir:
-                args.append(f"--dicdir={self.dic_dir}")
-
+            args, kwargs = self._command()
             try:
-                if platform.system() == "Windows":
-                    si = subprocess.STARTUPINFO()
-                    si.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                else:
-                    si = None
-                self._inst = Popen(args, stdin=PIPE, stdout=PIPE, env=env, startupinfo=si)
+                self._inst = Popen(args, stdin=PIPE, stdout=PIPE, **kwargs)
             except FileNotFoundError:
                 raise MecabError("executable not found")
 
         return self._inst
 
-    def analyze(self, txt: str) -> List[ParserUnit]:
+    def _stop(self):
+        if self._inst is not None:
+            if self._inst.poll() is None:
+                self._inst.kill()
+                self._inst.wait()
+            self._inst = None
+
+    def close(self):
+        self._closed = True
+        self._stop()
+
+    @staticmethod
+    def _encode(txt: str) -> bytes:
         if "\n" in txt:
             raise MecabError("line feed in text passed to analyze function")
+        return txt.encode("utf-8")
+
+    @staticmethod
+    def _read_units(stdout: IO[bytes], utf8_bytes: bytes) -> List[ParserUnit]:
+        def read_lines() -> Iterator[bytes]:
+            while (line := stdout.readline().rstrip(b"\r\n")) != b"EOS":
+                if not line:
+                    raise _MecabExited("unexpected end of output")
+                yield line
+
+        return add_gaps(utf8_bytes, parse_node_lines(read_lines()))
+
+    def analyze(self, txt: str) -> List[ParserUnit]:
+        utf8_bytes = self._encode(txt)
+        # a process that died while handling the request is restarted and the request is sent once more
+        for retry in (True, False):
+            inst = self._instance()
+            try:
+                inst.stdin.write(utf8_bytes + b"\n")
+                inst.stdin.flush()
+                return self._read_units(inst.stdout, utf8_bytes)
+            except (OSError, _MecabExited):
+                self._stop()
+                if not retry:
+                    raise MecabError("MeCab exited unexpectedly")
+            except BaseException:
+                # the rest of the output is still in the pipe and would be read as the next result
+                self._stop()
+                raise
+
+    def analyze_many(self, lines: Iterable[str]) -> Iterator[List[ParserUnit]]:
+        # a separate thread keeps MeCab's stdin fed while results are read here; writing and reading
+        # on the same thread would deadlock as soon as both pipe buffers are full
+        encoded = [self._encode(line) for line in lines]
+        if not encoded:
+            return
 
         inst = self._instance()
-        utf8_bytes = txt.encode("utf-8")
-        inst.stdin.write(utf8_bytes + b"\n")
-        inst.stdin.flush()
-        units = []
-        last_end = 0
-        while (line := inst.stdout.readline().rstrip(b"\r\n")) != b"EOS":
-            unit, start, end = MecabUnit.from_line(line.decode("utf-8"))
-            if last_end != start:
-                units.append(ParserUnit(utf8_bytes[last_end:start].decode("utf-8")))
-            last_end = end
-            units.append(unit)
-        return units
+        write_error: List[BaseException] = []
+
+        def write_all():
+            try:
+                for utf8_bytes in encoded:
+                    inst.stdin.write(utf8_bytes + b"\n")
+                inst.stdin.flush()
+            except (OSError, ValueError) as e:
+                write_error.append(e)
+
+        writer = threading.Thread(target=write_all, daemon=True)
+        writer.start()
+        done = False
+        try:
+            for utf8_bytes in encoded:
+                yield self._read_units(inst.stdout, utf8_bytes)
+            done = True
+        finally:
+            if not done:
+                # results that weren't read are still in the pipe, so the process can't be reused
+                inst.kill()
+                inst.wait()
+            writer.join()
+        if write_error:
+            raise MecabError(f"failed to write to MeCab: {write_error[0]}")
+
+
+class _MecabNode(ctypes.Structure):
+    pass
+
+
+_MecabNode._fields_ = [
+    ("prev", ctypes.POINTER(_MecabNode)),
+    ("next", ctypes.POINTER(_MecabNode)),
+    ("enext", ctypes.POINTER(_MecabNode)),
+    ("bnext", ctypes.POINTER(_MecabNode)),
+    ("rpath", ctypes.c_void_p),
+    ("lpath", ctypes.c_void_p),
+    ("surface", ctypes.c_void_p),
+    ("feature", ctypes.c_char_p),
+    ("id", ctypes.c_uint),
+    ("length", ctypes.c_ushort),
+    ("rlength", ctypes.c_ushort),
+    ("rcAttr", ctypes.c_ushort),
+    ("lcAttr", ctypes.c_ushort),
+    ("posid", ctypes.c_ushort),
+    ("char_type", ctypes.c_ubyte),
+    ("stat", ctypes.c_ubyte),
+    ("isbest", ctypes.c_ubyte),
+    ("alpha", ctypes.c_float),
+    ("beta", ctypes.c_float),
+    ("prob", ctypes.c_float),
+    ("wcost", ctypes.c_short),
+    ("cost", ctypes.c_long),
+]
+
+_MECAB_BOS_NODE = 2
+_MECAB_EOS_NODE = 3
+
+
+def _load_libmecab(exe_path: Optional[str]) -> ctypes.CDLL:
+    # the bundled library sits next to the bundled executable, otherwise use the system one
+    candidates = []
+    if exe_path:
+        exe_dir = os.path.dirname(exe_path)
+        candidates.extend(os.path.join(exe_dir, name)
+                          for name in ("libmecab.dll", "libmecab.so.2", "libmecab.so", "libmecab.2.dylib"))
+    if lib_name := ctypes.util.find_library("mecab") or ctypes.util.find_library("libmecab"):
+        candidates.append(lib_name)
+
+    for candidate in candidates:
+        if os.path.isabs(candidate) and not os.path.exists(candidate):
+            continue
+        try:
+            lib = ctypes.CDLL(candidate)
+        except OSError:
+            continue
+        lib.mecab_new.restype = ctypes.c_void_p
+        lib.mecab_new.argtypes = (ctypes.c_int, ctypes.POINTER(ctypes.c_char_p))
+        lib.mecab_strerror.restype = ctypes.c_char_p
+        lib.mecab_strerror.argtypes = (ctypes.c_void_p,)
+        lib.mecab_sparse_tonode2.restype = ctypes.POINTER(_MecabNode)
+        lib.mecab_sparse_tonode2.argtypes = (ctypes.c_void_p, ctypes.c_char_p, ctypes.c_size_t)
+        lib.mecab_destroy.restype = None
+        lib.mecab_destroy.argtypes = (ctypes.c_void_p,)
+        return lib
+    raise MecabError("library not found")
+
+
+class LibMecab:
+    # same interface as Mecab, but runs the tagger in this process; not safe to share between threads
+    exe_path: Optional[str]
+    dic_dir: Optional[str]
+    _lib: ctypes.CDLL
+    _tagger: Optional[int] = None
+    _closed: bool = False
+
+    def __init__(self, exe_path: Optional[str] = None, dic_dir: Optional[str] = None):
+        self.exe_path = exe_path
+        self.dic_dir = dic_dir
+        self._lib = _load_libmecab(exe_path)
+
+    def _instance(self) -> int:
+        # like the processes, the tagger is only created, and the dictionary loaded, once it's first used
+        if self._closed:
+            raise MecabError("MeCab was closed")
+        if not self._tagger:
+            args = ["mecab", "--unk-feature=未知語"]
+            if self.exe_path:
+                args.append(f"--rcfile={os.path.join(os.path.dirname(self.exe_path), 'mecabrc')}")
+            if self.dic_dir:
+                args.append(f"--dicdir={self.dic_dir}")
+            argv = (ctypes.c_char_p * len(args))(*(arg.encode("utf-8") for arg in args))
+            self._tagger = self._lib.mecab_new(len(args), argv)
+            if not self._tagger:
+                raise MecabError("failed to create tagger: "
+                                 f"{self._lib.mecab_strerror(None).decode('utf-8', 'replace')}")
+        return self._tagger
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        self._closed = True
+        if getattr(self, "_tagger", None):
+            self._lib.mecab_destroy(self._tagger)
+            self._tagger = None
+
+    def analyze(self, txt: str) -> List[ParserUnit]:
+        utf8_bytes = Mecab._encode(txt)
+        tagger = self._instance()
+        buf = ctypes.create_string_buffer(utf8_bytes, len(utf8_bytes))
+        node = self._lib.mecab_sparse_tonode2(tagger, buf, len(utf8_bytes))
+        if not node:
+            raise MecabError(self._lib.mecab_strerror(tagger).decode("utf-8", "replace"))
+
+        base = ctypes.addressof(buf)
+
+        def parse_nodes() -> Iterator[Tuple[MecabUnit, int, int]]:
+            nd = node
+            while nd:
+                n = nd.contents
+                if n.stat != _MECAB_BOS_NODE and n.stat != _MECAB_EOS_NODE:
+                    start = n.surface - base
+                    end = start + n.length
+                    orig = utf8_bytes[start:end].decode("utf-8")
+                    yield MecabUnit.from_features(orig, n.feature.decode("utf-8").split(",")), start, end
+                nd = n.next
+
+        return add_gaps(utf8_bytes, parse_nodes())
+
+    def analyze_many(self, lines: Iterable[str]) -> Iterator[List[ParserUnit]]:
+        return (self.analyze(line) for line in lines)
+
+
+def create_mecab(exe_path: Optional[str] = None, dic_dir: Optional[str] = None,
+                 use_library: bool = False) -> Union[Mecab, LibMecab]:
+    if use_library:
+        try:
+            return LibMecab(exe_path, dic_dir)
+        except MecabError:
+            pass
+    return Mecab(exe_path, dic_dir)
+
+
+@dataclass
+class MecabPool:
+    exe_path: Optional[str] = None
+    dic_dir: Optional[str] = None
+    size: int = 0
+    use_library: bool = False
+    chunk_size: int = 256
+    _instances: List[Union[Mecab, LibMecab]] = field(default_factory=list, init=False, repr=False)
+    # the most recently used instance is handed out first, so the others are only started under load;
+    # None is put in once the pool is closed, to wake up waiting threads
+    _free: "queue.LifoQueue[Union[Mecab, LibMecab, None]]" = field(default_factory=queue.LifoQueue, init=False,
+                                                                    repr=False)
+    _closed: bool = field(default=False, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self):
+        # subprocesses and library taggers are only started once an instance is first used
+        if self.size <= 0:
+            self.size = os.cpu_count() or 1
+        self._instances = [create_mecab(self.exe_path, self.dic_dir, self.use_library) for _ in range(self.size)]
+        for inst in self._instances:
+            self._free.put(inst)
+
+    def close(self):
+        # instances that are in use are closed by the thread using them once it's done
+        with self._lock:
+            self._closed = True
+            while True:
+                try:
+                    inst = self._free.get_nowait()
+                except queue.Empty:
+                    break
+                if inst is not None:
+                    inst.close()
+            self._free.put(None)
+
+    def _give_back(self, inst: Union[Mecab, LibMecab]):
+        with self._lock:
+            if self._closed:
+                inst.close()
+            else:
+                self._free.put(inst)
+
+    def _run(self, fn: Callable[[Union[Mecab, LibMecab], T], U], arg: T) -> U:
+        if (inst := self._free.get()) is None:
+            self._free.put(None)
+            raise MecabError("MeCab was closed")
+        try:
+            return fn(inst, arg)
+        finally:
+            self._give_back(inst)
+
+    def _analyze_chunk(self, lines: List[str]) -> List[List[ParserUnit]]:
+        return self._run(lambda inst, ls: list(inst.analyze_many(ls)), lines)
+
+    def analyze(self, txt: str) -> List[ParserUnit]:
+        return self._run(lambda inst, t: inst.analyze(t), txt)
+
+    def analyze_many(self, lines: Iterable[str]) -> Iterator[List[ParserUnit]]:
+        # contiguous chunks keep each instance's pipeline full, map() returns them in input order
+        lines = list(lines)
+        chunks = [lines[i:i + self.chunk_size] for i in range(0, len(lines), self.chunk_size)]
+        if len(chunks) <= 1 or self.size == 1:
+            yield from self._analyze_chunk(lines)
+            return
+
+        with ThreadPoolExecutor(min(self.size, len(chunks))) as executor:
+            for results in executor.map(self._analyze_chunk, chunks):
+                yield from results
@@ -0,0 +1,147 @@
+# This project is licensed under the terms of the GNU GPL v3: https://www.gnu.org/licenses/; © 2022 Ben Kerman
+import hashlib
+import os
+import pickle
+import shutil
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .mecab import ParserUnit
+from .util import warn
+
+# bump when the units produced from MeCab's output change
+_FORMAT = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS analyses (line TEXT PRIMARY KEY, units BLOB NOT NULL);
+"""
+
+
+def mecab_identity(exe_path: Optional[str], dic_dir: Optional[str]) -> str:
+    # results only stay valid for the same executable and dictionary; a system dictionary in an
+    # unknown location is covered by the executable, which is usually updated along with it
+    parts = [str(_FORMAT)]
+    for path in (exe_path or shutil.which("mecab"), dic_dir and os.path.join(dic_dir, "sys.dic")):
+        try:
+            st = os.stat(path)
+            parts.append(f"{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}")
+        except (OSError, TypeError):
+            parts.append(str(path))
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+class CachedMecab:
+    # same interface as Mecab, results are looked up in memory, then on disk, then analyzed
+    _inner: Any
+    _memory: "OrderedDict[str, List[ParserUnit]]"
+    _memory_size: int
+    _disk_size: int
+    _conn: Optional[sqlite3.Connection] = None
+    _lock: threading.Lock
+    _since_trim = 0
+
+    def __init__(self, inner, db_path, identity: str, memory_size: int = 4096, disk_size: int = 20000):
+        self._inner = inner
+        self._memory = OrderedDict()
+        self._memory_size = memory_size
+        self._disk_size = disk_size
+        self._lock = threading.Lock()
+        if disk_size <= 0:
+            return
+        try:
+            self._conn = self._open(db_path, identity, disk_size)
+        except sqlite3.Error as e:
+            warn(f"analysis cache {db_path} unavailable, only caching in memory: {e}")
+
+    @staticmethod
+    def _trim(conn: sqlite3.Connection, disk_size: int):
+        # oldest entries go first once the store is full
+        conn.execute("DELETE FROM analyses WHERE rowid <= (SELECT MAX(rowid) FROM analyses) - ?", (disk_size,))
+
+    @classmethod
+    def _open(cls, db_path, identity: str, disk_size: int) -> sqlite3.Connection:
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        try:
+            with conn:
+                conn.executescript(_SCHEMA)
+                if conn.execute("SELECT value FROM meta WHERE key = 'identity'").fetchone() != (identity,):
+                    conn.execute("DELETE FROM analyses")
+                    conn.execute("INSERT OR REPLACE INTO meta VALUES ('identity', ?)", (identity,))
+                cls._trim(conn, disk_size)
+        except sqlite3.Error:
+            conn.close()
+            raise
+        return conn
+
+    def close(self):
+        if close := getattr(self._inner, "close", None):
+            close()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def warm_up(self, txt: str):
+        # goes straight to the backend, a cached result wouldn't start anything; a pool
+        # only starts the instance that is handed out next
+        self._inner.analyze(txt)
+
+    def _remember(self, line: str, units: List[ParserUnit]):
+        self._memory[line] = units
+        self._memory.move_to_end(line)
+        if len(self._memory) > self._memory_size:
+            self._memory.popitem(last=False)
+
+    def _get(self, line: str) -> Optional[List[ParserUnit]]:
+        with self._lock:
+            if (units := self._memory.get(line)) is not None:
+                self._memory.move_to_end(line)
+                return units
+            if self._conn is None:
+                return None
+            try:
+                row = self._conn.execute("SELECT units FROM analyses WHERE line = ?", (line,)).fetchone()
+                units = pickle.loads(row[0]) if row else None
+            except (sqlite3.Error, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+                warn(f"failed to read analysis cache: {e}")
+                return None
+            if units is not None:
+                self._remember(line, units)
+            return units
+
+    def _put(self, results: Dict[str, List[ParserUnit]]):
+        with self._lock:
+            for line, units in results.items():
+                self._remember(line, units)
+            if self._conn is None:
+                return
+            try:
+                with self._conn:
+                    self._conn.executemany("INSERT OR REPLACE INTO analyses VALUES (?, ?)",
+                                           ((line, pickle.dumps(units, pickle.HIGHEST_PROTOCOL))
+                                            for line, units in results.items()))
+                    # trimming in batches keeps the store from growing much past its size during a session
+                    self._since_trim += len(results)
+                    if self._since_trim >= max(self._disk_size // 10, 1):
+                        self._trim(self._conn, self._disk_size)
+                        self._since_trim = 0
+            except sqlite3.Error as e:
+                warn(f"failed to write analysis cache: {e}")
+
+    def analyze(self, txt: str) -> List[ParserUnit]:
+        if (units := self._get(txt)) is None:
+            units = self._inner.analyze(txt)
+            self._put({txt: units})
+        return list(units)
+
+    def analyze_many(self, lines: Iterable[str]) -> Iterator[List[ParserUnit]]:
+        lines = list(lines)
+        found = {line: units for line in dict.fromkeys(lines) if (units := self._get(line)) is not None}
+        missing = [line for line in dict.fromkeys(lines) if line not in found]
+        if missing:
+            analyzed = dict(zip(missing, self._inner.analyze_many(missing)))
+            self._put(analyzed)
+            found.update(analyzed)
+        return (list(found[line]) for line in lines)
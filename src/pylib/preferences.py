@@ -60,6 +60,12 @@ class AddonPrefs:
     mecab_dict_dir: str = os.path.join("data", "ipadic")
     mecab_use_system_exe: bool = platform.system() != "Windows"
     mecab_use_system_dict: bool = False
+    mecab_processes: int = 0
+    mecab_use_library: bool = False
+    mecab_cache_size: int = 20000
+    dict_use_sqlite: bool = False
+    dict_sqlite_cache_size: int = 8
+    dict_unload_after: int = 0
     note_types: List[NoteTypePrefs] = field(default_factory=list)
 
 
@@ -123,6 +129,11 @@ class ConvPrefs:
                     return gen
         return None
 
+    def word_or_has_prefix(self, prefix: str) -> bool:
+        defaults = (do.value for do in default_overrides.word if do.id not in self.disabled_override_ids.word)
+        return any(v.startswith(prefix) for wo in chain(self.overrides.word, defaults)
+                   if wo.pre_lookup for v in wo.old_variants)
+
     def apply_accent_or(self, variant: str, reading: str) -> Optional[List[Accent]]:
         defaults = (ao.value for ao in default_overrides.accent if ao.id not in self.disabled_override_ids.accent)
         for ao in chain(self.overrides.accent, defaults):
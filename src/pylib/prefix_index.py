@@ -0,0 +1,35 @@
+# This project is licensed under the terms of the GNU GPL v3: https://www.gnu.org/licenses/; © 2022 Ben Kerman
+from bisect import bisect_left
+from typing import Iterable, List
+
+
+class PrefixIndex:
+    _keys: List[str]
+
+    def __init__(self, keys: Iterable[str]):
+        self._keys = sorted(keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        i = bisect_left(self._keys, key)
+        return i < len(self._keys) and self._keys[i] == key
+
+    def has_prefix(self, prefix: str) -> bool:
+        i = bisect_left(self._keys, prefix)
+        return i < len(self._keys) and self._keys[i].startswith(prefix)
+
+    def common_prefixes(self, text: str) -> List[int]:
+        # every key that is a prefix of text sorts at or after the previous one,
+        # so a single pass with a rising lower bound finds all of them
+        lengths = []
+        lo = 0
+        for n in range(1, len(text) + 1):
+            prefix = text[:n]
+            lo = bisect_left(self._keys, prefix, lo)
+            if lo >= len(self._keys) or not self._keys[lo].startswith(prefix):
+                break
+            if len(self._keys[lo]) == n:
+                lengths.append(n)
+        return lengths
@@ -235,19 +235,19 @@ def _parse_migaku_accents(val: str, reading: str) -> List[Accent]:
     def convert(tag: str) -> Accent:
         m = _mi_acc_re.fullmatch(tag)
         if not m:
-            return Accent(None)
+            return Accent.pooled(None)
 
         pat_c = m.group(1)
         if pat_c == "h":
-            return Accent(0)
+            return Accent.pooled(0)
         elif pat_c == "a":
-            return Accent(1)
+            return Accent.pooled(1)
         elif pat_c == "k" or pat_c == "n":
             if not m.group(2):
                 raise ParsingError(f"missing downstep number: {tag}")
-            return Accent(int(m.group(2)))
+            return Accent.pooled(int(m.group(2)))
         elif pat_c == "o":
-            return Accent(moras)
+            return Accent.pooled(moras)
         else:
             raise ParsingError(f"invalid Migaku accent pattern: {tag}")
 
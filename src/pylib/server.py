@@ -0,0 +1,195 @@
+# This project is licensed under the terms of the GNU GPL v3: https://www.gnu.org/licenses/; © 2022 Ben Kerman
+import os
+import pickle
+import queue
+import socket
+import socketserver
+import stat
+import struct
+import tempfile
+import threading
+from typing import Any, Callable, List, Optional, Sequence
+
+from . import version
+from .converter import convert
+from .dictionary import Dictionary
+from .mecab import Mecab, MecabError, ParserUnit
+from .preferences import ConvPrefs
+from .segments import Unit
+
+# requests and responses are pickled, so the socket must only be reachable by the user running the server;
+# it's created in a directory only that user can access, and both sides check that before using it
+_FRAME = struct.Struct("!I")
+
+
+class ServerError(Exception):
+    pass
+
+
+def default_socket_path() -> str:
+    if runtime_dir := os.environ.get("XDG_RUNTIME_DIR"):
+        return os.path.join(runtime_dir, "anki-jrp", "server.sock")
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    return os.path.join(tempfile.gettempdir(), f"anki-jrp-{uid}", "server.sock")
+
+
+def _is_private(path: str, is_dir: bool) -> bool:
+    # anyone can create a directory with a predictable name in the temp dir, so it has to be
+    # owned by this user and closed to everyone else, and must not be a link to somewhere else
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    kind_ok = stat.S_ISDIR(st.st_mode) if is_dir else stat.S_ISSOCK(st.st_mode)
+    return kind_ok and st.st_uid == os.getuid() and st.st_mode & 0o077 == 0
+
+
+def _send(sock: socket.socket, obj: Any):
+    data = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    sock.sendall(_FRAME.pack(len(data)) + data)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise EOFError("connection closed")
+        buf += chunk
+    return bytes(buf)
+
+
+def _recv(sock: socket.socket) -> Any:
+    size, = _FRAME.unpack(_recv_exact(sock, _FRAME.size))
+    return pickle.loads(_recv_exact(sock, size))
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    server: "ConversionServer"
+
+    def handle(self):
+        while True:
+            try:
+                op, args = _recv(self.request)
+            except (EOFError, ConnectionError):
+                return
+
+            try:
+                resp = True, self.server.dispatch(op, *args)
+            except (MecabError, ServerError) as e:
+                resp = False, str(e)
+            _send(self.request, resp)
+
+
+if hasattr(socket, "AF_UNIX"):
+    class ConversionServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+        dictionary: Dictionary
+        # the dictionary's lookup cache isn't safe to use from several handler threads at once
+        _dict_lock: threading.Lock
+        _mecabs: "queue.Queue[Mecab]"
+
+        def __init__(self, path: str, dic: Dictionary, mecabs: Sequence[Mecab]):
+            self.dictionary = dic
+            self._dict_lock = threading.Lock()
+            self._mecabs = queue.Queue()
+            for mecab in mecabs:
+                self._mecabs.put(mecab)
+
+            sock_dir = os.path.dirname(path)
+            os.makedirs(sock_dir, mode=0o700, exist_ok=True)
+            if not _is_private(sock_dir, is_dir=True):
+                raise ServerError(f"{sock_dir} must be a directory only accessible by the current user")
+            if os.path.lexists(path):
+                os.remove(path)
+            super().__init__(path, _Handler)
+            os.chmod(path, 0o600)
+
+        def server_close(self):
+            super().server_close()
+            try:
+                os.remove(self.server_address)
+            except OSError:
+                pass
+
+        def _analyze(self, lines: Sequence[str]) -> List[List[ParserUnit]]:
+            # a whole batch goes to one instance, other connections use the remaining ones
+            mecab = self._mecabs.get()
+            try:
+                return list(mecab.analyze_many(lines))
+            finally:
+                self._mecabs.put(mecab)
+
+        def dispatch(self, op: str, *args) -> Any:
+            if op == "version":
+                return version.script
+            elif op == "analyze":
+                return self._analyze(*args)
+            elif op == "convert":
+                lines, prefs = args
+                analyzed = self._analyze(lines)
+                with self._dict_lock:
+                    return [convert(punits, prefs, self.dictionary) for punits in analyzed]
+            raise ServerError(f"unknown request: {op}")
+
+
+class ConversionClient:
+    _path: str
+    _mecab: Mecab
+    _load_dict: Callable[[], Dictionary]
+    _dictionary: Optional[Dictionary] = None
+    _sock: Optional[socket.socket] = None
+
+    def __init__(self, mecab: Mecab, load_dict: Callable[[], Dictionary], path: Optional[str] = None):
+        self._path = path or default_socket_path()
+        self._mecab = mecab
+        self._load_dict = load_dict
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def _connect(self) -> Optional[socket.socket]:
+        if self._sock is None and hasattr(socket, "AF_UNIX") \
+                and _is_private(os.path.dirname(self._path), is_dir=True) and _is_private(self._path, is_dir=False):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self._path)
+                _send(sock, ("version", ()))
+                if _recv(sock) == (True, version.script):
+                    self._sock = sock
+                    return sock
+            except (OSError, EOFError):
+                pass
+            sock.close()
+        return self._sock
+
+    def _request(self, op: str, *args) -> Optional[Any]:
+        if (sock := self._connect()) is None:
+            return None
+        try:
+            _send(sock, (op, args))
+            ok, result = _recv(sock)
+        except (OSError, EOFError):
+            # server went away, use the local fallback from now on until it's reachable again
+            self.close()
+            return None
+        if not ok:
+            raise MecabError(result)
+        return result
+
+    def uses_server(self) -> bool:
+        return self._connect() is not None
+
+    def analyze(self, lines: Sequence[str]) -> List[List[ParserUnit]]:
+        if (result := self._request("analyze", list(lines))) is not None:
+            return result
+        return [self._mecab.analyze(line) for line in lines]
+
+    def convert(self, lines: Sequence[str], prefs: ConvPrefs) -> List[List[Unit]]:
+        if (result := self._request("convert", list(lines), prefs)) is not None:
+            return result
+        if self._dictionary is None:
+            self._dictionary = self._load_dict()
+        return [convert(self._mecab.analyze(line), prefs, self._dictionary) for line in lines]
@@ -0,0 +1,170 @@
+# This project is licensed under the terms of the GNU GPL v3: https://www.gnu.org/licenses/; © 2022 Ben Kerman
+import os
+import sqlite3
+from collections import OrderedDict
+from typing import Collection, Dict, Generic, Iterator, List, Optional, Type, TypeVar, Union
+
+from .dictionary import EntryCollector, file_digest, iter_entries
+from .normalize import to_hiragana
+
+T = TypeVar("T")
+
+_VERSION = 3
+_MAX_CHAR = chr(0x10ffff)
+
+_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value NOT NULL);
+CREATE TABLE entries (id INTEGER PRIMARY KEY, line TEXT NOT NULL);
+CREATE TABLE variants (variant TEXT NOT NULL, entry INTEGER NOT NULL);
+CREATE TABLE readings (reading TEXT NOT NULL, hiragana_reading TEXT NOT NULL, entry INTEGER NOT NULL);
+"""
+
+_INDEXES = """
+CREATE INDEX variants_variant ON variants (variant);
+CREATE INDEX readings_reading ON readings (reading);
+CREATE INDEX readings_hiragana_reading ON readings (hiragana_reading);
+"""
+
+
+class _KeyView:
+    def __init__(self, conn: sqlite3.Connection, table: str, column: str):
+        self._conn = conn
+        self._table = table
+        self._column = column
+
+    def __len__(self) -> int:
+        return self._conn.execute(f"SELECT COUNT(DISTINCT {self._column}) FROM {self._table}").fetchone()[0]
+
+    def __iter__(self) -> Iterator[str]:
+        return (key for key, in self._conn.execute(f"SELECT DISTINCT {self._column} FROM {self._table}"))
+
+    def __contains__(self, key: object) -> bool:
+        query = f"SELECT 1 FROM {self._table} WHERE {self._column} = ? LIMIT 1"
+        return self._conn.execute(query, (key,)).fetchone() is not None
+
+
+class SqliteDict(Generic[T]):
+    _entry_type: Type[T]
+    _conn: sqlite3.Connection
+    _entries: "OrderedDict[int, T]"
+    _entry_cache_size: int
+    lazy = True
+
+    def __init__(self, entry_type: Type[T], path, cache_kib: int = 8192, entry_cache_size: int = 65536):
+        self._entry_type = entry_type
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA query_only = ON")
+        self._conn.execute(f"PRAGMA cache_size = {-int(cache_kib)}")
+        self._conn.execute("PRAGMA mmap_size = 0")
+        self._entries = OrderedDict()
+        self._entry_cache_size = entry_cache_size
+
+    def close(self):
+        self._entries.clear()
+        self._conn.close()
+
+    def meta(self) -> Dict[str, Union[int, str]]:
+        try:
+            return dict(self._conn.execute("SELECT key, value FROM meta"))
+        except sqlite3.DatabaseError:
+            return {}
+
+    def _entry(self, entry_id: int, line: str) -> T:
+        # entries are compared by identity, so the same ID has to map to the same object
+        entry = self._entries.get(entry_id)
+        if entry is None:
+            entry = self._entries[entry_id] = self._entry_type.from_line(line)
+            if len(self._entries) > self._entry_cache_size:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(entry_id)
+        return entry
+
+    def _look_up(self, query: str, val: str) -> Optional[List[T]]:
+        rows = self._conn.execute(query, (val,)).fetchall()
+        return [self._entry(entry_id, line) for entry_id, line in rows] or None
+
+    def look_up_variant(self, val: str) -> Optional[List[T]]:
+        return self._look_up("SELECT e.id, e.line FROM variants v JOIN entries e ON e.id = v.entry "
+                             "WHERE v.variant = ? ORDER BY v.rowid", val)
+
+    def look_up_reading(self, val: str) -> Optional[List[T]]:
+        return self._look_up("SELECT e.id, e.line FROM readings r JOIN entries e ON e.id = r.entry "
+                             "WHERE r.hiragana_reading = ? ORDER BY r.rowid", to_hiragana(val))
+
+    def keys(self, as_reading: bool = False) -> Collection[str]:
+        if as_reading:
+            return _KeyView(self._conn, "readings", "hiragana_reading")
+        return _KeyView(self._conn, "variants", "variant")
+
+    def _has_key(self, table: str, column: str, prefix: str, exact: bool = False) -> bool:
+        if exact:
+            query = f"SELECT 1 FROM {table} WHERE {column} = ? LIMIT 1"
+            args: tuple = (prefix,)
+        else:
+            query = f"SELECT 1 FROM {table} WHERE {column} >= ? AND {column} < ? LIMIT 1"
+            args = (prefix, prefix + _MAX_CHAR)
+        return self._conn.execute(query, args).fetchone() is not None
+
+    def has_prefix(self, prefix: str, as_reading: bool = False) -> bool:
+        if as_reading:
+            return self._has_key("readings", "hiragana_reading", to_hiragana(prefix))
+        return self._has_key("variants", "variant", prefix)
+
+    def common_prefixes(self, text: str, as_reading: bool = False) -> List[int]:
+        table, column = ("readings", "hiragana_reading") if as_reading else ("variants", "variant")
+        if as_reading:
+            text = to_hiragana(text)
+        lengths = []
+        for n in range(1, len(text) + 1):
+            if not self._has_key(table, column, text[:n]):
+                break
+            if self._has_key(table, column, text[:n], exact=True):
+                lengths.append(n)
+        return lengths
+
+
+def _source_meta(src_path) -> Dict[str, Union[int, str]]:
+    # keyed on the content rather than the modification time, so that a database built
+    # elsewhere with build_sqlite_dict.py is still used for the same data
+    return {"version": _VERSION, "source_size": os.path.getsize(src_path), "source_hash": file_digest(src_path)}
+
+
+def build_sqlite_dict(entry_type: Type[T], src_path, db_path, workers: int = 1):
+    tmp_path = f"{db_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(_SCHEMA)
+        ids: Dict[int, int] = {}
+        coll: EntryCollector[T] = EntryCollector()
+        with conn:
+            for line, entry in iter_entries(entry_type, src_path, workers):
+                ids[id(entry)] = conn.execute("INSERT INTO entries (line) VALUES (?)", (line,)).lastrowid
+                entry_type.dict_insert(coll, entry)
+
+            conn.executemany("INSERT INTO variants VALUES (?, ?)",
+                             ((var, ids[id(e)]) for var, entries in coll.variants.items() for e in entries))
+            conn.executemany("INSERT INTO readings VALUES (?, ?, ?)",
+                             ((e.reading, hira_rdng, ids[id(e)])
+                              for hira_rdng, entries in coll.readings.items() for e in entries))
+
+            conn.executemany("INSERT INTO meta VALUES (?, ?)", _source_meta(src_path).items())
+        conn.executescript(_INDEXES)
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    os.replace(tmp_path, db_path)
+
+
+def load_sqlite(entry_type: Type[T], src_path, db_path, cache_kib: int = 8192, workers: int = 1) -> SqliteDict[T]:
+    if os.path.exists(db_path):
+        sdict = SqliteDict(entry_type, db_path, cache_kib)
+        if sdict.meta() == _source_meta(src_path):
+            return sdict
+        sdict.close()
+
+    build_sqlite_dict(entry_type, src_path, db_path, workers)
+    return SqliteDict(entry_type, db_path, cache_kib)